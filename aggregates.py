@@ -0,0 +1,215 @@
+# Equal-width bins over [0, 1] for the positive score and the confidence
+SCORE_BINS = 10
+CONFIDENCE_BINS = 100
+
+# Confidence quantiles reported in results
+CONFIDENCE_QUANTILES = (0.1, 0.5, 0.9)
+
+
+def _bin(value, bins):
+    return min(int(value * bins), bins - 1)
+
+
+def histogram_quantile(histogram, q):
+    """Approximate q-quantile of values in [0, 1] from an equal-width histogram (interpolating within a bin)"""
+    total = sum(histogram)
+    if total <= 0:
+        return None
+    target = q * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count > 0 and seen + count >= target:
+            return (index + (target - seen) / count) / len(histogram)
+        seen += count
+    return 1.0
+
+
+class SentimentTotals:
+    """
+    Running sums behind the aggregate fields of an analysis result. Reviews
+    can be added and taken back out one at a time, and the totals of
+    separate chunks or shards merged, so results can be built from a
+    stream of reviews in constant memory.
+    """
+
+    # Bumped when fields are added, so stored totals from older versions can be rebuilt
+    version = 2
+
+    def __init__(self):
+        # Every review counts towards the total, including ones without text
+        self.total_reviews = 0
+        self.total_rating = 0
+        self.total_positive_score = 0.0
+        self.total_negative_score = 0.0
+        self.sentiment_distribution = {
+            "Positive": 0,
+            "Negative": 0,
+            "Neutral": 0
+        }
+        self.product_related = 0
+        self.non_product_related = 0
+        # Number of reviews mentioning each non-product keyword category
+        self.feedback_categories = {}
+        # Analyzed reviews per star rating (rounded), positive score bin and confidence bin
+        self.rating_histogram = {}
+        self.sentiment_score_histogram = [0] * SCORE_BINS
+        self.confidence_histogram = [0] * CONFIDENCE_BINS
+
+    def add(self, scored, sign=1):
+        """
+        Add one scored review (as returned by SentimentAnalyzer.score_reviews).
+        Pass sign=-1 to take a previously added review back out.
+        """
+        self.total_reviews += sign
+        if scored is None:
+            # Review had no text: counted in the total but not analyzed
+            return
+
+        row = scored["row"]
+        self.total_rating += sign * row["rating"]
+        self.total_positive_score += sign * scored["positive_score"]
+        self.total_negative_score += sign * scored["negative_score"]
+        self.sentiment_distribution[row["sentiment"]] += sign
+        if row["product_related"]:
+            self.product_related += sign
+        else:
+            self.non_product_related += sign
+
+        for category, count in scored.get("categories", {}).items():
+            mentioned = sign if count else 0
+            self.feedback_categories[category] = self.feedback_categories.get(category, 0) + mentioned
+
+        stars = str(round(row["rating"]))
+        self.rating_histogram[stars] = self.rating_histogram.get(stars, 0) + sign
+        self.sentiment_score_histogram[_bin(scored["positive_score"], SCORE_BINS)] += sign
+        self.confidence_histogram[_bin(row["confidence"], CONFIDENCE_BINS)] += sign
+
+    def remove(self, scored):
+        self.add(scored, sign=-1)
+
+    def merge(self, other):
+        """Add the totals of another chunk or shard"""
+        self.total_reviews += other.total_reviews
+        self.total_rating += other.total_rating
+        self.total_positive_score += other.total_positive_score
+        self.total_negative_score += other.total_negative_score
+        for label, count in other.sentiment_distribution.items():
+            self.sentiment_distribution[label] += count
+        self.product_related += other.product_related
+        self.non_product_related += other.non_product_related
+        for category, count in other.feedback_categories.items():
+            self.feedback_categories[category] = self.feedback_categories.get(category, 0) + count
+        for stars, count in other.rating_histogram.items():
+            self.rating_histogram[stars] = self.rating_histogram.get(stars, 0) + count
+        self.sentiment_score_histogram = [
+            mine + theirs for mine, theirs in zip(self.sentiment_score_histogram, other.sentiment_score_histogram)
+        ]
+        self.confidence_histogram = [
+            mine + theirs for mine, theirs in zip(self.confidence_histogram, other.confidence_histogram)
+        ]
+
+    def to_results(self):
+        """Return the aggregate fields of an analyze_reviews result"""
+        results = {
+            "total_reviews": self.total_reviews,
+            "sentiment_distribution": dict(self.sentiment_distribution),
+            "average_rating": 0,
+            "product_related": self.product_related,
+            "non_product_related": self.non_product_related,
+            "feedback_categories": dict(self.feedback_categories),
+            "rating_histogram": {stars: count for stars, count in sorted(self.rating_histogram.items()) if count},
+            # Reviews per tenth of the 0-100 sentiment score scale
+            "sentiment_score_histogram": list(self.sentiment_score_histogram),
+        }
+
+        if any(self.confidence_histogram):
+            # Approximate (to the width of a bin)
+            results["confidence_quantiles"] = {
+                f"p{int(q * 100)}": histogram_quantile(self.confidence_histogram, q) for q in CONFIDENCE_QUANTILES
+            }
+
+        if self.total_reviews > 0:
+            results["average_rating"] = self.total_rating / self.total_reviews
+
+            # Convert to a 0-100 scale where 50 is neutral
+            # Higher values are more positive, lower values are more negative
+            avg_positive_score = self.total_positive_score / self.total_reviews
+            results["overall_sentiment_score"] = int(avg_positive_score * 100)
+
+            # Determine overall sentiment category
+            if results["overall_sentiment_score"] >= 75:
+                results["overall_sentiment"] = "Very Positive"
+            elif results["overall_sentiment_score"] >= 60:
+                results["overall_sentiment"] = "Positive"
+            elif results["overall_sentiment_score"] >= 40:
+                results["overall_sentiment"] = "Neutral"
+            elif results["overall_sentiment_score"] >= 25:
+                results["overall_sentiment"] = "Negative"
+            else:
+                results["overall_sentiment"] = "Very Negative"
+
+        return results
+
+    def to_dict(self):
+        return dict(
+            vars(self),
+            sentiment_distribution=dict(self.sentiment_distribution),
+            feedback_categories=dict(self.feedback_categories),
+            rating_histogram=dict(self.rating_histogram),
+            sentiment_score_histogram=list(self.sentiment_score_histogram),
+            confidence_histogram=list(self.confidence_histogram),
+            version=self.version,
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild totals saved with to_dict, or None if they were saved by an older version"""
+        if data.get("version") != cls.version:
+            return None
+        totals = cls()
+        for name, value in data.items():
+            if name != "version":
+                setattr(totals, name, value)
+        return totals
+
+
+class ResultAccumulator:
+    """
+    Collects scored reviews into SentimentTotals and detailed_analysis rows,
+    keeping at most max_detail_rows rows (all of them when None) so memory
+    stays bounded however many reviews stream through.
+    """
+
+    def __init__(self, max_detail_rows=None):
+        self.max_detail_rows = max_detail_rows
+        self.totals = SentimentTotals()
+        self.detailed_analysis = []
+        # Rows left out because of the cap
+        self.omitted_rows = 0
+
+    def add(self, scored):
+        self.totals.add(scored)
+        if scored is None:
+            return
+        room = self._room()
+        if room is None or room > 0:
+            self.detailed_analysis.append(scored["row"])
+        else:
+            self.omitted_rows += 1
+
+    def add_many(self, scored_reviews):
+        for scored in scored_reviews:
+            self.add(scored)
+
+    def merge(self, other):
+        """Add everything another accumulator (e.g. a worker's shard) collected, after what is here"""
+        self.totals.merge(other.totals)
+        kept = other.detailed_analysis[:self._room()]
+        self.detailed_analysis.extend(kept)
+        self.omitted_rows += other.omitted_rows + len(other.detailed_analysis) - len(kept)
+
+    def _room(self):
+        """Rows that can still be kept, or None if there is no cap"""
+        if self.max_detail_rows is None:
+            return None
+        return self.max_detail_rows - len(self.detailed_analysis)
@@ -0,0 +1,177 @@
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+except ImportError:  # Falls back to BeautifulSoup's built-in parser
+    lxml = None
+
+NO_REVIEWS_MESSAGE = "There are no customer reviews yet"
+
+# Classes of the div whose span holds the "no reviews" message
+NO_REVIEWS_CLASSES = ("a-row", "a-spacing-medium", "a-spacing-top-large")
+
+# Review fields and the (tag, data-hook) they are read from, in order of preference
+FIELD_ELEMENTS = {
+    "rating": (("i", "review-star-rating"),),
+    "title": (("a", "review-title"), ("span", "review-title")),
+    "date": (("span", "review-date"),),
+    "text": (("span", "review-body"),),
+    "verified": (("span", "avp-badge"),),
+}
+
+_NO_REVIEWS_XPATH = "//div[{}]/span".format(
+    " and ".join(f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')" for name in NO_REVIEWS_CLASSES)
+)
+
+
+class ReviewPage:
+    """The parts of an Amazon review page the crawler uses"""
+
+    def __init__(self, reviews, total_reviews_text=None, no_reviews=False):
+        self.reviews = reviews
+        # Text of the "1,234 total ratings | 567 with reviews" element, if any
+        self.total_reviews_text = total_reviews_text
+        # Whether the page says the product has no reviews yet
+        self.no_reviews = no_reviews
+
+
+def parse_review_page(html, parser=None):
+    """
+    Parse an Amazon review page. Uses lxml directly when it is installed
+    and otherwise BeautifulSoup, keeping only the elements that are read.
+    """
+    if (parser or ("lxml" if lxml is not None else "bs4")) == "lxml":
+        return _parse_with_lxml(html)
+    return _parse_with_bs4(html)
+
+
+def _review_from_elements(review_id, elements, text_of):
+    """
+    Build a review from the (tag, data-hook, classes, element) of the
+    elements inside its div, looking at each element once
+    """
+    first = {}
+    star = None
+    for tag, hook, classes, element in elements:
+        if hook is not None and (tag, hook) not in first:
+            first[tag, hook] = element
+        if star is None and classes and "a-icon-star" in classes:
+            star = element
+
+    def field(name):
+        for key in FIELD_ELEMENTS[name]:
+            if key in first:
+                return first[key]
+        return None
+
+    rating_element = field("rating")
+    if rating_element is None:
+        rating_element = star
+    if rating_element is None:
+        # Skip reviews without ratings
+        return None
+
+    title_element = field("title")
+    date_element = field("date")
+    text_element = field("text")
+
+    return {
+        "id": review_id,
+        "rating": float(text_of(rating_element).strip().split(" ")[0]),
+        "title": text_of(title_element).strip() if title_element is not None else "",
+        "date": text_of(date_element).strip() if date_element is not None else "",
+        "text": text_of(text_element).strip() if text_element is not None else "",
+        "verified": field("verified") is not None,
+    }
+
+
+def _collect_reviews(review_divs):
+    reviews = []
+    for review_id, elements, text_of in review_divs:
+        try:
+            review = _review_from_elements(review_id, elements, text_of)
+        except Exception as e:
+            print(f"Error extracting review: {str(e)}")
+            continue
+        if review is not None:
+            reviews.append(review)
+    return reviews
+
+
+# Whitespace html.parser collapses (see _lxml_text)
+_ASCII_SPACES = " \n\t\f\r"
+
+
+def _lxml_text(element):
+    # Match BeautifulSoup, which turns each whitespace-only string into a
+    # single newline (or space, if it has no newline)
+    return "".join(
+        text if text.strip(_ASCII_SPACES) else ("\n" if "\n" in text else " ")
+        for text in element.itertext()
+    )
+
+
+def _parse_with_lxml(html):
+    if not html.strip():
+        return ReviewPage([])
+    tree = lxml.html.fromstring(html)
+
+    no_reviews = tree.xpath(_NO_REVIEWS_XPATH)
+    total = tree.xpath('//div[@data-hook="cr-filter-info-review-rating-count"]')
+
+    # Only the tags the fields are read from; classes are only needed for the star icon fallback
+    review_divs = (
+        (
+            div.get("id", ""),
+            ((el.tag, el.get("data-hook"), el.get("class", "").split() if el.tag == "i" else None, el)
+             for el in div.iter("i", "a", "span")),
+            _lxml_text,
+        )
+        for div in tree.iter("div") if div.get("data-hook") == "review"
+    )
+    return ReviewPage(
+        _collect_reviews(review_divs),
+        total_reviews_text=_lxml_text(total[0]).strip() if total else None,
+        no_reviews=bool(no_reviews) and NO_REVIEWS_MESSAGE in _lxml_text(no_reviews[0]),
+    )
+
+
+def _keep_element(name, attrs):
+    """SoupStrainer filter: the review divs, the review count and the "no reviews" notice"""
+    if name != "div":
+        return False
+    if attrs.get("data-hook") in ("review", "cr-filter-info-review-rating-count"):
+        return True
+    classes = attrs.get("class") or ()
+    if isinstance(classes, str):
+        classes = classes.split()
+    return all(cls in classes for cls in NO_REVIEWS_CLASSES)
+
+
+_STRAINER = SoupStrainer(_keep_element)
+
+
+def _bs4_text(element):
+    return element.text
+
+
+def _parse_with_bs4(html):
+    soup = BeautifulSoup(html, "html.parser", parse_only=_STRAINER)
+
+    no_reviews = soup.select_one("div.a-row.a-spacing-medium.a-spacing-top-large > span")
+    total = soup.select_one('div[data-hook="cr-filter-info-review-rating-count"]')
+
+    review_divs = (
+        (
+            div.get("id", ""),
+            ((el.name, el.get("data-hook"), el.get("class") if el.name == "i" else None, el)
+             for el in div.find_all(["i", "a", "span"])),
+            _bs4_text,
+        )
+        for div in soup.find_all("div", {"data-hook": "review"})
+    )
+    return ReviewPage(
+        _collect_reviews(review_divs),
+        total_reviews_text=total.text.strip() if total else None,
+        no_reviews=no_reviews is not None and NO_REVIEWS_MESSAGE in no_reviews.text,
+    )
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from incremental import review_keys
+
+
+def review_set_fingerprint(reviews):
+    """Hash of which reviews were crawled and what they say, independent of their order"""
+    digest = hashlib.sha256()
+    for identity, content in sorted(review_keys(reviews)):
+        digest.update(f"{identity}:{content}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class CachedAnalysis:
+    """A finished analysis and the review set it was computed from"""
+
+    def __init__(self, results, fingerprint, stored_at):
+        self.results = results
+        self.fingerprint = fingerprint
+        self.stored_at = stored_at
+
+    def age(self):
+        return time.time() - self.stored_at
+
+
+class AnalysisCache:
+    """
+    LRU cache of whole-product analysis results, keyed by product id and the
+    analysis configuration. Entries younger than `ttl` seconds are served
+    without crawling; older ones are kept with the fingerprint of their
+    review set, so a new crawl that finds the same reviews reuses them
+    instead of running the model again.
+    """
+
+    def __init__(self, max_entries=256, ttl=600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        # Stale entries reused because the crawl found the same reviews
+        self.reused = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(product_id, config):
+        """Hash the product id together with everything that changes the result (model, threshold, mode, ...)"""
+        return hashlib.sha256(f"{product_id}\0{json.dumps(config, sort_keys=True)}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the CachedAnalysis stored for the key, fresh or not, or None"""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+            return cached
+
+    def is_fresh(self, cached):
+        return cached.age() < self.ttl
+
+    def put(self, key, results, fingerprint):
+        with self._lock:
+            self._entries[key] = CachedAnalysis(results, fingerprint, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def refresh(self, key, cached):
+        """Restart the TTL of an entry a new crawl has confirmed is still current"""
+        self.put(key, cached.results, cached.fingerprint)
+
+    def record(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.reused + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "reused": self.reused,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.reused) / lookups if lookups else 0.0,
+            }
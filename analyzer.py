@@ -1,12 +1,52 @@
+import itertools
+import threading
+
+import numpy as np
 import torch
 from transformers import AutoModelForSequenceClassification, AutoTokenizer
 from tqdm import tqdm
 
+from aggregates import ResultAccumulator
+from backends import create_backend
+from batching import padding_report, plan_batches
+from keywords import KeywordMatcher
+import metrics
+from model_config import MODEL_NAME, SENTIMENT_THRESHOLD
+from summarizer import Summarizer
+
+# Index order used by the vectorised thresholding in _probabilities_to_results
+SENTIMENT_LABELS = ("Negative", "Neutral", "Positive")
+
+# Reviews scored at a time by analyze_reviews; enough for length-sorted batching to pay off
+ANALYZE_CHUNK_SIZE = 1024
+
 class SentimentAnalyzer:
-    def __init__(self):
+    def __init__(self, batch_size=32, max_batch_tokens=8192, cache=None, backend="torch", keyword_matcher=None,
+                 summary_mode="lead", token_cache=None, max_detail_rows=None):
         # Load pre-trained model and tokenizer
-        # Using DistilBERT which is smaller and faster than BERT but still effective
-        self.model_name = "distilbert-base-uncased-finetuned-sst-2-english"
+        self.model_name = MODEL_NAME
+        self.max_length = 512
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.last_batch_report = None
+        
+        # Optional SentimentCache consulted before running the model
+        self.cache = cache
+        
+        # Optional TokenCache holding token ids of previously seen texts
+        self.token_cache = token_cache
+        
+        # Shipping/returns/service keywords used to spot non-product feedback
+        self.keyword_matcher = keyword_matcher or KeywordMatcher()
+        
+        # Per-review summaries: opening sentences ("lead") or the sentences
+        # the model is most confident about ("extractive")
+        self.summarizer = Summarizer(mode=summary_mode)
+        
+        self.threshold = SENTIMENT_THRESHOLD
+        
+        # Most detailed_analysis rows kept in a result (None keeps them all)
+        self.max_detail_rows = max_detail_rows
         
         print(f"Loading model: {self.model_name}")
         self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
@@ -15,54 +55,180 @@ class SentimentAnalyzer:
         # Check if GPU is available
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model.to(self.device)
+        self.model.eval()
         print(f"Using device: {self.device}")
+        
+        # Inference backend (fp32 PyTorch, int8-quantized PyTorch or ONNX Runtime)
+        self.backend = create_backend(backend, self.model, self.device, self.model_name)
+        print(f"Using inference backend: {self.backend.name}")
+        
+        # Identifies the model/backend pair in cache keys, since backends
+        # other than fp32 PyTorch give slightly different scores
+        self.model_id = self.model_name if backend == "torch" else f"{self.model_name}:{backend}"
+        
+        # Identifies the tokenizer output in token cache keys
+        self.tokenizer_id = f"{self.model_name}:{self.max_length}"
+        
+        # The model is shared across Flask worker threads; fast tokenizers are
+        # not safe to call concurrently, so inference is serialised
+        self.lock = threading.Lock()
+    
+    def warm_up(self):
+        """Run a throwaway inference so the first real request isn't slow"""
+        # Bypass the cache, otherwise a persisted entry would skip the model
+        self._run_model(["This is a warm-up review."])
+    
+    def _truncate_text(self, text):
+        """Truncate text if it's too long to avoid tokenizer errors"""
+        if len(text) > self.max_length * 4:  # Rough character estimate
+            text = text[:self.max_length * 4]
+        return text
     
     def _classify_text(self, text):
         """Classify text as positive, negative, or neutral"""
-        # Truncate text if it's too long to avoid tokenizer errors
-        max_length = 512
-        if len(text) > max_length * 4:  # Rough character estimate
-            text = text[:max_length * 4]
-            
-        # Tokenize and get prediction
-        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, max_length=max_length)
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        return self._classify_batch([text])[0]
+    
+    def _classify_batch(self, texts, batch_size=None):
+        """Classify a list of texts, skipping the model for cached texts"""
+        if self.cache is None:
+            return self._run_model(texts, batch_size)
         
-        with torch.no_grad():
-            outputs = self.model(**inputs)
+        keys = self.cache_keys(texts)
+        cached = self.cache.get_many(keys)
+        
+        # Only run the model once per distinct uncached text
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        
+        if missing:
+            fresh = dict(zip(missing, self._run_model(list(missing.values()), batch_size)))
+            self.cache.put_many(fresh)
+            cached.update(fresh)
+        
+        return [dict(cached[key]) for key in keys]
+    
+    def cache_keys(self, texts):
+        """Sentiment cache keys of the texts, for this model and backend"""
+        return [self.cache.make_key(self._truncate_text(text), self.model_id) for text in texts]
+    
+    def texts_to_classify(self, reviews):
+        """Every text score_reviews runs the model on: the review texts and any sentences ranked for summaries"""
+        texts = [review['text'] for review in reviews if review.get('text', '')]
+        sentences = self.summarizer.sentences_to_rank(texts).values()
+        return texts + [sentence for review_sentences in sentences for sentence in review_sentences]
+    
+    def _run_model(self, texts, batch_size=None):
+        """Classify a list of texts, running one forward pass per batch"""
+        batch_size = batch_size or self.batch_size
+        if not texts:
+            return []
+        
+        # Tokenize everything once without padding to learn each text's length
+        sequences = self._tokenize([self._truncate_text(text) for text in texts])
+        lengths = [len(sequence) for sequence in sequences]
+        
+        # Sort by length and cut batches under a padded-token budget, so short
+        # reviews are not padded up to the longest review in the run
+        batches = plan_batches(lengths, max_tokens=self.max_batch_tokens, max_batch_size=batch_size)
+        self.last_batch_report = padding_report(lengths, batches, naive_batch_size=batch_size)
+        
+        results = [None] * len(texts)
+        for batch in tqdm(batches, desc="Classifying batches", disable=len(batches) <= 1):
+            inputs = self._collate([sequences[i] for i in batch])
             
-        # Get prediction (0 = negative, 1 = positive)
-        logits = outputs.logits
-        probabilities = torch.nn.functional.softmax(logits, dim=1)
-        
-        # Convert to sentiment label with confidence
-        neg_prob = probabilities[0][0].item()
-        pos_prob = probabilities[0][1].item()
-        
-        # Determine sentiment based on probability
-        if pos_prob > 0.7:
-            sentiment = "Positive"
-        elif neg_prob > 0.7:
-            sentiment = "Negative"
-        else:
-            sentiment = "Neutral"
+            with self.lock, metrics.timer("inference"):
+                logits = self.backend.logits(**inputs)
             
+            # Put results back in the original order
+            for index, result in zip(batch, self._probabilities_to_results(logits)):
+                results[index] = result
+        
+        if len(batches) > 1:
+            report = self.last_batch_report
+            print(f"Padding efficiency: {report['padding_efficiency']:.1%} over {report['batches']} batches "
+                  f"(fixed-size batches: {report['naive_padding_efficiency']:.1%})")
+        
+        return results
+    
+    def _tokenize(self, texts):
+        """Return the unpadded token ids of each text, reusing cached ones"""
+        with metrics.timer("tokenize"):
+            return self._lookup_tokens(texts)
+    
+    def _lookup_tokens(self, texts):
+        if self.token_cache is None:
+            with self.lock:
+                return self.tokenizer(texts, truncation=True, max_length=self.max_length)["input_ids"]
+        
+        keys = [self.token_cache.make_key(text, self.tokenizer_id) for text in texts]
+        cached = self.token_cache.get_many(keys)
+        
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        
+        if missing:
+            with self.lock:
+                encoded = self.tokenizer(list(missing.values()), truncation=True, max_length=self.max_length)
+            fresh = dict(zip(missing, encoded["input_ids"]))
+            self.token_cache.put_many(fresh)
+            cached.update(fresh)
+        
+        return [cached[key] for key in keys]
+    
+    def _collate(self, sequences):
+        """Pad token id sequences to the longest one and build model inputs"""
+        longest = max(len(sequence) for sequence in sequences)
+        # Filled in NumPy, which copies lists and (memory-mapped) cached
+        # arrays alike, then handed to torch without another copy
+        input_ids = np.full((len(sequences), longest), self.tokenizer.pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((len(sequences), longest), dtype=np.int64)
+        
+        for row, sequence in enumerate(sequences):
+            input_ids[row, :len(sequence)] = sequence
+            attention_mask[row, :len(sequence)] = 1
+        
         return {
-            "sentiment": sentiment,
-            "confidence": max(neg_prob, pos_prob),
-            "positive_score": pos_prob,
-            "negative_score": neg_prob
+            "input_ids": torch.from_numpy(input_ids).to(self.device),
+            "attention_mask": torch.from_numpy(attention_mask).to(self.device)
         }
     
-    def _is_product_related(self, text):
-        """Check if review is about the product or about shipping/service/etc."""
-        shipping_keywords = [
-            "shipping", "delivery", "arrived", "package", "box", "damaged",
-            "return", "refund", "customer service", "late", "delay"
+    def _probabilities_to_results(self, logits):
+        """Turn a batch of logits into sentiment labels with confidence"""
+        # Get prediction (0 = negative, 1 = positive)
+        probabilities = torch.nn.functional.softmax(logits, dim=1).cpu()
+        neg_probs = probabilities[:, 0]
+        pos_probs = probabilities[:, 1]
+        
+        # Determine sentiment based on probability: Positive wins over
+        # Negative, anything under the threshold on both sides is Neutral
+        labels = torch.full(pos_probs.shape, SENTIMENT_LABELS.index("Neutral"))
+        labels[neg_probs > self.threshold] = SENTIMENT_LABELS.index("Negative")
+        labels[pos_probs > self.threshold] = SENTIMENT_LABELS.index("Positive")
+        confidences = probabilities.max(dim=1).values
+        
+        return [
+            {
+                "sentiment": SENTIMENT_LABELS[label],
+                "confidence": confidence,
+                "positive_score": pos_prob,
+                "negative_score": neg_prob
+            }
+            for label, confidence, pos_prob, neg_prob in zip(
+                labels.tolist(), confidences.tolist(), pos_probs.tolist(), neg_probs.tolist()
+            )
         ]
+    
+    def _is_product_related(self, text, match=None):
+        """Check if review is about the product or about shipping/service/etc."""
+        if match is None:
+            match = self.keyword_matcher.match(text)
         
-        # Count occurrences of shipping-related keywords
-        shipping_count = sum(1 for keyword in shipping_keywords if keyword.lower() in text.lower())
+        # Count distinct shipping/service-related keywords
+        shipping_count = len(match["keywords"])
         
         # If more than 2 shipping keywords are found and they make up a significant portion of the text
         words = text.split()
@@ -73,125 +239,106 @@ class SentimentAnalyzer:
     
     def _generate_summary(self, text, max_words=50):
         """Generate a simple summary of the review text"""
-        # For a more sophisticated summary, we would use a summarization model
-        # But for simplicity, we'll just take the first few sentences
+        return self.summarize_batch([text], max_words)[0]
+    
+    def summarize_batch(self, texts, max_words=None):
+        """Summarize a batch of review texts"""
+        summarizer = self.summarizer
+        if max_words is not None and max_words != summarizer.max_words:
+            summarizer = Summarizer(max_words, summarizer.mode)
+        return summarizer.summarize_batch(texts, self._sentence_scores)
+    
+    def _sentence_scores(self, sentences):
+        """Score sentences by how strongly the model leans positive or negative"""
+        return [
+            abs(result["positive_score"] - result["negative_score"])
+            for result in self._classify_batch(sentences)
+        ]
+    
+    def analyze_reviews(self, reviews, batch_size=None):
+        """
+        Analyze reviews and return sentiment analysis. Takes any iterable of
+        reviews and scores it a chunk at a time, so memory stays bounded by
+        the chunk and max_detail_rows rather than the number of reviews.
+        """
+        if hasattr(reviews, "__len__"):
+            print(f"Analyzing {len(reviews)} reviews...")
         
-        sentences = text.split('.')
-        summary = ""
-        word_count = 0
+        accumulator = ResultAccumulator(self.max_detail_rows)
+        reviews = iter(reviews)
+        for chunk in iter(lambda: list(itertools.islice(reviews, ANALYZE_CHUNK_SIZE)), []):
+            scored_reviews = self.score_reviews(chunk, batch_size=batch_size)
+            with metrics.timer("aggregate"):
+                accumulator.add_many(scored_reviews)
         
-        for sentence in sentences:
-            if not sentence.strip():
-                continue
-                
-            words = sentence.split()
-            if word_count + len(words) <= max_words:
-                summary += sentence.strip() + ". "
-                word_count += len(words)
-            else:
-                # Add words until we reach the limit
-                remaining_words = max_words - word_count
-                if remaining_words > 0:
-                    summary += " ".join(words[:remaining_words]) + "..."
-                break
-                
-        return summary.strip()
-    
-    def analyze_reviews(self, reviews):
-        """Analyze a list of reviews and return sentiment analysis"""
-        if not reviews:
-            return {
-                "error": "No reviews to analyze"
-            }
-            
-        results = {
-            "total_reviews": len(reviews),
-            "sentiment_distribution": {
-                "Positive": 0,
-                "Negative": 0,
-                "Neutral": 0
-            },
-            "average_rating": 0,
-            "product_related": 0,
-            "non_product_related": 0,
-            "detailed_analysis": []
-        }
+        return self.results_from(accumulator)
+    
+    def score_reviews(self, reviews, batch_size=None):
+        """
+        Score each review, returning one entry per review (None for reviews
+        without text) holding the detailed_analysis row and the raw model scores
+        """
+        # Reviews without text are skipped (but still count towards the total)
+        text_reviews = [review for review in reviews if review.get('text', '')]
         
-        total_rating = 0
-        total_positive_score = 0
-        total_negative_score = 0
+        # Classify all review texts up front in batches
+        texts = [review['text'] for review in text_reviews]
+        sentiment_results = iter(self._classify_batch(texts, batch_size=batch_size))
+        with metrics.timer("keywords"):
+            keyword_matches = iter(self.keyword_matcher.match_batch(texts))
+        with metrics.timer("summarize"):
+            summaries = iter(self.summarize_batch(texts))
+        metrics.increment("reviews_scored_total", len(texts))
         
-        print(f"Analyzing {len(reviews)} reviews...")
-        for review in tqdm(reviews):
+        scored_reviews = []
+        for review in reviews:
             # Get the review text and rating
             review_text = review.get('text', '')
             rating = review.get('rating', 0)
             
             if not review_text:
+                scored_reviews.append(None)
                 continue
-                
-            # Add to total rating
-            total_rating += rating
-            
-            # Check if review is product-related
-            is_product_related = self._is_product_related(review_text)
-            
-            if is_product_related:
-                results["product_related"] += 1
-            else:
-                results["non_product_related"] += 1
-            
-            # Analyze sentiment
-            sentiment_result = self._classify_text(review_text)
-            sentiment = sentiment_result["sentiment"]
-            
-            # Accumulate sentiment scores
-            total_positive_score += sentiment_result["positive_score"]
-            total_negative_score += sentiment_result["negative_score"]
             
-            # Update sentiment distribution
-            results["sentiment_distribution"][sentiment] += 1
+            sentiment_result = next(sentiment_results)
+            keyword_match = next(keyword_matches)
             
-            # Generate summary
-            summary = self._generate_summary(review_text)
-            
-            # Add to detailed analysis
-            results["detailed_analysis"].append({
-                "rating": rating,
-                "sentiment": sentiment,
-                "confidence": sentiment_result["confidence"],
-                "product_related": is_product_related,
-                "summary": summary,
-                "review_title": review.get('title', ''),
-                "review_date": review.get('date', '')
+            scored_reviews.append({
+                "row": {
+                    "rating": rating,
+                    "sentiment": sentiment_result["sentiment"],
+                    "confidence": sentiment_result["confidence"],
+                    "product_related": self._is_product_related(review_text, keyword_match),
+                    "summary": next(summaries),
+                    "review_title": review.get('title', ''),
+                    "review_date": review.get('date', '')
+                },
+                "positive_score": sentiment_result["positive_score"],
+                "negative_score": sentiment_result["negative_score"],
+                "categories": keyword_match["categories"]
             })
         
-        # Calculate average rating
-        if results["total_reviews"] > 0:
-            results["average_rating"] = total_rating / results["total_reviews"]
-            
-            # Calculate overall sentiment score (0-100 scale)
-            avg_positive_score = total_positive_score / results["total_reviews"]
-            avg_negative_score = total_negative_score / results["total_reviews"]
-            
-            # Convert to a 0-100 scale where 50 is neutral
-            # Higher values are more positive, lower values are more negative
-            results["overall_sentiment_score"] = int(avg_positive_score * 100)
+        return scored_reviews
+    
+    def results_from(self, accumulator):
+        """Build the result of a ResultAccumulator, or the usual error if it saw no reviews"""
+        if accumulator.totals.total_reviews == 0:
+            return {
+                "error": "No reviews to analyze"
+            }
+        return self.build_results(accumulator.totals, accumulator.detailed_analysis, accumulator.omitted_rows)
+    
+    def build_results(self, totals, detailed_analysis, omitted_rows=0):
+        """Assemble the analysis result from running totals and detail rows"""
+        with metrics.timer("aggregate"):
+            results = totals.to_results()
+            results["detailed_analysis"] = detailed_analysis
+            if omitted_rows:
+                # Rows past max_detail_rows; the aggregates still cover them
+                results["detailed_analysis_omitted"] = omitted_rows
             
-            # Determine overall sentiment category
-            if results["overall_sentiment_score"] >= 75:
-                results["overall_sentiment"] = "Very Positive"
-            elif results["overall_sentiment_score"] >= 60:
-                results["overall_sentiment"] = "Positive"
-            elif results["overall_sentiment_score"] >= 40:
-                results["overall_sentiment"] = "Neutral"
-            elif results["overall_sentiment_score"] >= 25:
-                results["overall_sentiment"] = "Negative"
-            else:
-                results["overall_sentiment"] = "Very Negative"
-        
-        # Add overall summary
-        results["overall_summary"] = self._generate_overall_summary(results)
+            # Add overall summary
+            results["overall_summary"] = self._generate_overall_summary(results)
         
         return results
     
@@ -1,17 +1,64 @@
 import os
 import json
-from flask import Flask, render_template, request, jsonify
+import threading
+import time
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, url_for
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
 # Import our custom modules
-from crawler import get_crawler_for_url
-from analyzer import SentimentAnalyzer
+from analysis_cache import AnalysisCache
+from crawler import get_crawler_for_url, product_id_from_url
+from model_registry import registry
+from jobs import JobManager
+import metrics
+from pipeline import iter_analysis
+
+# When the app was imported, for the uptime reported by /status/live
+started_at = time.time()
 
 app = Flask(__name__)
 
+data_dir = os.path.join(os.path.dirname(__file__), 'data')
+
+# Crawled reviews of every product, deduplicated across crawls. Opened on
+# first use, since the store needs numpy
+_review_store = None
+_review_store_lock = threading.Lock()
+
+
+def get_review_store():
+    global _review_store
+    with _review_store_lock:
+        if _review_store is None:
+            from review_store import ReviewStore
+            _review_store = ReviewStore(os.path.join(data_dir, 'reviews'))
+        return _review_store
+
+# Default for requests that don't say whether to analyze incrementally
+incremental_default = os.environ.get('INCREMENTAL_ANALYSIS', '0') == '1'
+
+# Recent /analyze results, served again without crawling while fresh
+analysis_cache_ttl = float(os.environ.get('ANALYSIS_CACHE_TTL', '600'))
+analysis_cache = AnalysisCache(
+    max_entries=int(os.environ.get('ANALYSIS_CACHE_SIZE', '256')), ttl=analysis_cache_ttl
+) if analysis_cache_ttl > 0 else None
+
+# Background workers for /analyze jobs, each process loads its own model
+job_manager = JobManager(
+    data_dir, max_workers=int(os.environ.get('JOB_WORKERS', '1')), analysis_cache=analysis_cache
+)
+
+# Load the model once at startup instead of on the first request, either
+# before serving (1) or in the background while already serving (background)
+preload_mode = os.environ.get('PRELOAD_MODEL', '1')
+if preload_mode == 'background':
+    registry.preload_in_background()
+elif preload_mode != '0':
+    registry.preload()
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -25,37 +72,137 @@ def analyze():
         if not product_url or not ('amazon' in product_url.lower() or 'walmart' in product_url.lower()):
             return jsonify({'error': 'Please provide a valid Amazon or Walmart product URL'}), 400
         
-        # Initialize the appropriate crawler and get reviews
-        # The crawler will automatically use mock data if it can't retrieve real reviews
-        crawler = get_crawler_for_url(product_url)
-        reviews = crawler.crawl_reviews(product_url, max_reviews=500)
-        
-        if not reviews:
-            return jsonify({'error': 'Could not retrieve reviews from the provided URL'}), 400
-            
-        # Save reviews to a JSON file for reference
-        data_dir = os.path.join(os.path.dirname(__file__), 'data')
-        os.makedirs(data_dir, exist_ok=True)
+        product_id = product_id_from_url(product_url)
         
-        product_id = product_url.split('/dp/')[-1].split('/')[0] if '/dp/' in product_url else product_url.split('/')[-1].split('?')[0]
-        reviews_file = os.path.join(data_dir, f'{product_id}_reviews.json')
+        # Analyze incrementally (only reviews not seen before) if asked to
+        incremental = request.form.get('incremental')
+        if incremental is None:
+            incremental = incremental_default
+        else:
+            incremental = incremental.lower() in ('1', 'true', 'on')
         
-        with open(reviews_file, 'w') as f:
-            json.dump(reviews, f, indent=2)
+        cache_key = None
+        if analysis_cache is not None:
+            config = dict(registry.analysis_config(), incremental=incremental, max_reviews=500)
+            cache_key = analysis_cache.make_key(product_id, config)
+            cached = analysis_cache.get(cache_key)
+            if cached is not None and analysis_cache.is_fresh(cached):
+                analysis_cache.record('hits')
+                age = cached.age()
+                return jsonify({
+                    'status': 'done',
+                    'result': dict(cached.results, analysis_cache={'hit': True, 'age_seconds': age}),
+                    'cached': True,
+                    'cache_age_seconds': age
+                })
         
-        # Analyze the reviews
-        analyzer = SentimentAnalyzer()
-        analysis_results = analyzer.analyze_reviews(reviews)
+        # Crawling and analysis run in a background worker; the client polls
+        # /jobs/<job_id> for progress and the result
+        job, coalesced = job_manager.submit(
+            product_url, product_id, incremental=incremental, max_reviews=500, cache_key=cache_key
+        )
         
-        return jsonify(analysis_results)
+        return jsonify({
+            'job_id': job['id'],
+            'status': job['status'],
+            'status_url': url_for('job_status', job_id=job['id']),
+            'coalesced': coalesced
+        }), 202
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job id'}), 404
+    return jsonify(job)
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """
+    Streaming variant of /analyze. Responds with newline-delimited JSON
+    events: a 'partial' event with new detailed_analysis rows and rolling
+    aggregates for every chunk analyzed, then a final 'done' event.
+    """
+    product_url = request.form.get('product_url')
+    
+    if not product_url or not ('amazon' in product_url.lower() or 'walmart' in product_url.lower()):
+        return jsonify({'error': 'Please provide a valid Amazon or Walmart product URL'}), 400
+    
+    product_id = product_id_from_url(product_url)
+    
+    def event(**fields):
+        return json.dumps(fields) + '\n'
+    
+    def generate():
+        with metrics.collect() as timings:
+            yield from stream_events(timings)
+    
+    def stream_events(timings):
+        try:
+            yield event(type='started', product_id=product_id)
+            
+            crawler = get_crawler_for_url(product_url)
+            analyzer = registry.get_analyzer()
+            
+            reviews = []
+            # Rows go out with each partial event, so only the aggregates are kept
+            for chunk, scored_reviews, accumulator in iter_analysis(crawler, analyzer, product_url, max_reviews=500,
+                                                                    keep_rows=False):
+                reviews.extend(chunk)
+                rows = [scored["row"] for scored in scored_reviews if scored is not None]
+                
+                aggregates = analyzer.build_results(accumulator.totals, [])
+                del aggregates['detailed_analysis']
+                yield event(type='partial', rows=rows, aggregates=aggregates, reviews_processed=len(reviews))
+            
+            if not reviews:
+                yield event(type='error', error='Could not retrieve reviews from the provided URL')
+                return
+            
+            # Keep the crawled reviews for reference
+            get_review_store().append(product_id, reviews)
+            
+            # The rows have already been sent, so the final event only carries the aggregates
+            results = analyzer.build_results(accumulator.totals, [])
+            del results['detailed_analysis']
+            results['timings'] = timings.to_dict()
+            if crawler.http_cache is not None:
+                results['http_cache'] = crawler.cache_stats.to_dict()
+            yield event(type='done', results=results)
+            
+        except Exception as e:
+            yield event(type='error', error=str(e))
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/status/live', methods=['GET'])
+def liveness():
+    # The process is up and serving; never touches the model
+    return jsonify({'status': 'ok', 'uptime_seconds': time.time() - started_at})
+
+@app.route('/status/ready', methods=['GET'])
+def readiness():
+    # Ready once the model is loaded; 503 while it is cold, loading or failed to load
+    state = registry.state
+    ready = state == 'warm'
+    return jsonify({'ready': ready, 'state': state, 'load_error': registry.load_error}), 200 if ready else 503
+
 @app.route('/status', methods=['GET'])
 def status():
     # For checking if the server is running
-    return jsonify({'status': 'ok'})
+    return jsonify({
+        'status': 'ok',
+        'model': registry.status(),
+        'analysis_cache': analysis_cache.stats() if analysis_cache is not None else None
+    })
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Stage timings and counters in the Prometheus text format
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     app.run(debug=True, port=5004)
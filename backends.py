@@ -0,0 +1,109 @@
+import os
+import tempfile
+
+import torch
+import transformers
+
+
+class TorchBackend:
+    """Eager PyTorch inference with the model as loaded (fp32)"""
+
+    name = "torch"
+
+    def __init__(self, model, device, model_name=None):
+        self.model = model
+        self.device = device
+
+    def logits(self, input_ids, attention_mask):
+        with torch.no_grad():
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """PyTorch inference with the Linear layers dynamically quantized to int8 (CPU only)"""
+
+    name = "quantized"
+
+    def __init__(self, model, device, model_name=None):
+        if device.type != "cpu":
+            raise ValueError("The quantized backend only runs on CPU")
+
+        quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        super().__init__(quantized, device, model_name)
+
+
+class OnnxBackend:
+    """ONNX Runtime inference on a one-off ONNX export of the model (CPU only)"""
+
+    name = "onnx"
+
+    def __init__(self, model, device, model_name=None, cache_dir=None):
+        if device.type != "cpu":
+            raise ValueError("The onnx backend only runs on CPU")
+
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("The onnx backend requires onnxruntime: pip install onnxruntime")
+
+        cache_dir = cache_dir or os.environ.get(
+            "ONNX_CACHE_DIR", os.path.join(os.path.dirname(__file__), "data", "onnx")
+        )
+        os.makedirs(cache_dir, exist_ok=True)
+        # The export depends on the exporter and model code, so upgrading either makes a new one
+        path = os.path.join(cache_dir, "{}-torch{}-transformers{}.onnx".format(
+            (model_name or 'model').replace('/', '_'), torch.__version__, transformers.__version__
+        ))
+
+        # Export once; later processes reuse the file
+        if not os.path.exists(path):
+            self._export(model, path)
+
+        self.session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        self.device = device
+
+    @staticmethod
+    def _export(model, path):
+        print(f"Exporting model to ONNX: {path}")
+        dummy = torch.ones((1, 8), dtype=torch.long)
+        # A temp file of its own, so processes exporting at the same time
+        # can't write into each other's file; the last rename wins
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            torch.onnx.export(
+                model,
+                (dummy, dummy),
+                tmp_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["logits"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "logits": {0: "batch"},
+                },
+                opset_version=17,
+                # The TorchScript-based exporter traces DistilBERT faithfully
+                dynamo=False,
+            )
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def logits(self, input_ids, attention_mask):
+        outputs = self.session.run(["logits"], {
+            "input_ids": input_ids.cpu().numpy(),
+            "attention_mask": attention_mask.cpu().numpy(),
+        })
+        return torch.from_numpy(outputs[0])
+
+
+BACKENDS = {backend.name: backend for backend in (TorchBackend, QuantizedTorchBackend, OnnxBackend)}
+
+
+def create_backend(name, model, device, model_name=None):
+    """Build the inference backend registered under name"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name](model, device, model_name)
@@ -0,0 +1,44 @@
+def plan_batches(lengths, max_tokens=8192, max_batch_size=64):
+    """
+    Group item indices into batches of similar token length.
+
+    Items are sorted by length so each batch pads to a length close to its
+    own items, and a batch is closed once its padded size (longest item
+    times batch size) would exceed max_tokens. Returns a list of index lists.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+
+    batches = []
+    current = []
+    for index in order:
+        # Sorted ascending, so the new item is always the longest in the batch
+        padded_size = lengths[index] * (len(current) + 1)
+        if current and (padded_size > max_tokens or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+        current.append(index)
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+def padding_report(lengths, batches, naive_batch_size=32):
+    """Compare padding waste of a batch plan against fixed-size batches in input order"""
+    real_tokens = sum(lengths)
+    padded_tokens = sum(max(lengths[i] for i in batch) * len(batch) for batch in batches)
+
+    naive_padded_tokens = 0
+    for start in range(0, len(lengths), naive_batch_size):
+        chunk = lengths[start:start + naive_batch_size]
+        naive_padded_tokens += max(chunk) * len(chunk)
+
+    return {
+        "items": len(lengths),
+        "batches": len(batches),
+        "real_tokens": real_tokens,
+        "padded_tokens": padded_tokens,
+        "padding_efficiency": real_tokens / padded_tokens if padded_tokens else 1.0,
+        "naive_padding_efficiency": real_tokens / naive_padded_tokens if naive_padded_tokens else 1.0,
+    }
@@ -0,0 +1,118 @@
+"""
+Benchmark streaming aggregation against collecting every scored review first.
+
+Scores a sample of seeded mock reviews with the model once, then repeats
+those scores to --reviews entries and aggregates them three ways: the
+original way (all scored reviews and rows held in lists, then summed), the
+streaming ResultAccumulator with no row cap, and with --max-detail-rows.
+Reports the time and peak Python memory (tracemalloc) of each, checks that
+the aggregates agree, and checks that merging shard accumulators gives the
+same result as a single pass.
+
+    python benchmarks/aggregates.py --reviews 200000 --max-detail-rows 100
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from aggregates import ResultAccumulator, SentimentTotals
+from analyzer import SentimentAnalyzer
+from mock_data import generate_reviews
+
+# Result fields only the new engine produces
+NEW_FIELDS = ('rating_histogram', 'sentiment_score_histogram', 'confidence_quantiles')
+
+
+def scored_stream(sample, count):
+    """count scored reviews, cycling through the sample (so nothing new is allocated per review)"""
+    return itertools.islice(itertools.cycle(sample), count)
+
+
+def collect_all(scored_reviews):
+    """What analyze_reviews did before: hold every scored review, then sum them up"""
+    scored_reviews = list(scored_reviews)
+    totals = SentimentTotals()
+    detailed_analysis = []
+    for scored in scored_reviews:
+        totals.add(scored)
+        if scored is not None:
+            detailed_analysis.append(dict(scored['row']))
+    return totals, detailed_analysis, 0
+
+
+def stream(scored_reviews, max_detail_rows):
+    accumulator = ResultAccumulator(max_detail_rows)
+    for scored in scored_reviews:
+        # Rows are copied so each one is a separate allocation, as freshly scored rows would be
+        accumulator.add(scored if scored is None else dict(scored, row=dict(scored['row'])))
+    return accumulator.totals, accumulator.detailed_analysis, accumulator.omitted_rows
+
+
+def measure(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    totals, rows, omitted = function()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return totals.to_results(), {
+        'seconds': seconds,
+        'peak_mib': peak / 2 ** 20,
+        'rows_kept': len(rows),
+        'rows_omitted': omitted,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reviews', type=int, default=200000)
+    parser.add_argument('--sample', type=int, default=512, help='distinct reviews scored by the model')
+    parser.add_argument('--max-detail-rows', type=int, default=100)
+    parser.add_argument('--shards', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # Keep the model's loading messages out of the JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        analyzer = SentimentAnalyzer()
+        sample = analyzer.score_reviews(generate_reviews(args.sample, seed=args.seed))
+
+    collected, collected_stats = measure(lambda: collect_all(scored_stream(sample, args.reviews)))
+    streamed, streamed_stats = measure(lambda: stream(scored_stream(sample, args.reviews), None))
+    capped, capped_stats = measure(lambda: stream(scored_stream(sample, args.reviews), args.max_detail_rows))
+
+    # Shards aggregated separately and merged in order, as the inference workers do
+    shard_size = -(-args.reviews // args.shards)
+    merged = ResultAccumulator(args.max_detail_rows)
+    for start in range(0, args.reviews, shard_size):
+        shard = ResultAccumulator(args.max_detail_rows)
+        shard.add_many(itertools.islice(scored_stream(sample, args.reviews), start, start + shard_size))
+        merged.merge(shard)
+
+    legacy_fields = {key: value for key, value in collected.items() if key not in NEW_FIELDS}
+    results = {
+        'reviews': args.reviews,
+        'max_detail_rows': args.max_detail_rows,
+        'collect_all': collected_stats,
+        'streaming': streamed_stats,
+        'streaming_capped': capped_stats,
+        'aggregates_match': legacy_fields == {key: streamed[key] for key in legacy_fields} and streamed == capped,
+        'shard_merge_matches': (
+            merged.totals.to_results() == capped and merged.omitted_rows == capped_stats['rows_omitted']
+        ),
+        'rating_histogram': capped['rating_histogram'],
+        'sentiment_score_histogram': capped['sentiment_score_histogram'],
+        'confidence_quantiles': capped.get('confidence_quantiles'),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
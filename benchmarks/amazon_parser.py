@@ -0,0 +1,165 @@
+"""
+Benchmark Amazon review page parsing against the original BeautifulSoup code.
+
+First checks that every parser gives the same reviews, review count and "no
+reviews" flag as the original code on each amazon_*.html fixture. Then it
+reports pages per second and the memory held by one parsed page. Memory is
+measured in a fresh process as the growth in peak RSS while parsed pages are
+kept alive, so lxml's C-level allocations are counted too.
+
+    python benchmarks/amazon_parser.py --pages 500
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bs4 import BeautifulSoup
+
+import amazon_parser
+from amazon_parser import parse_review_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+PARSERS = ['legacy', 'bs4'] + (['lxml'] if amazon_parser.lxml is not None else [])
+
+
+def legacy_parse(html):
+    """What AmazonReviewCrawler did before amazon_parser: a full html.parser soup and a find() per field"""
+    soup = BeautifulSoup(html, 'html.parser')
+    no_reviews_div = soup.select_one('div.a-row.a-spacing-medium.a-spacing-top-large > span')
+    total_reviews_element = soup.select_one('div[data-hook="cr-filter-info-review-rating-count"]')
+
+    reviews = []
+    for div in soup.find_all('div', {'data-hook': 'review'}):
+        try:
+            rating_span = div.find('i', {'data-hook': 'review-star-rating'})
+            if not rating_span:
+                rating_span = div.find('i', {'class': 'a-icon-star'})
+            if not rating_span:
+                continue
+            rating = float(rating_span.text.strip().split(' ')[0])
+
+            title_element = div.find('a', {'data-hook': 'review-title'})
+            if not title_element:
+                title_element = div.find('span', {'data-hook': 'review-title'})
+            date_element = div.find('span', {'data-hook': 'review-date'})
+            text_element = div.find('span', {'data-hook': 'review-body'})
+
+            reviews.append({
+                'id': div.get('id', ''),
+                'rating': rating,
+                'title': title_element.text.strip() if title_element else "",
+                'date': date_element.text.strip() if date_element else "",
+                'text': text_element.text.strip() if text_element else "",
+                'verified': div.find('span', {'data-hook': 'avp-badge'}) is not None,
+            })
+        except Exception:
+            continue
+
+    return amazon_parser.ReviewPage(
+        reviews,
+        total_reviews_text=total_reviews_element.text.strip() if total_reviews_element else None,
+        no_reviews=bool(no_reviews_div) and "There are no customer reviews yet" in no_reviews_div.text,
+    )
+
+
+def parse(parser, html):
+    if parser == 'legacy':
+        return legacy_parse(html)
+    return parse_review_page(html, parser=parser)
+
+
+def load_fixtures():
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'amazon_*.html'))):
+        with open(path) as f:
+            # Fill in the stub server's page placeholders
+            fixtures[os.path.basename(path)] = f.read().replace('__PAGE__', '1').replace('__NEXT__', '2')
+    return fixtures
+
+
+def check_parity(fixtures):
+    """Names of the fixtures where each parser disagrees with the original code"""
+    mismatches = {parser: [] for parser in PARSERS if parser != 'legacy'}
+    for name, html in fixtures.items():
+        expected = vars(legacy_parse(html))
+        for parser in mismatches:
+            if vars(parse(parser, html)) != expected:
+                mismatches[parser].append(name)
+    return mismatches
+
+
+def held_tree(parser, html):
+    """The parse tree a parser builds (and holds while extracting) for one page"""
+    if parser == 'legacy':
+        return BeautifulSoup(html, 'html.parser')
+    if parser == 'bs4':
+        return BeautifulSoup(html, 'html.parser', parse_only=amazon_parser._STRAINER)
+    return amazon_parser.lxml.html.fromstring(html)
+
+
+def memory_probe(parser, html, pages):
+    """Run in a child process: peak RSS growth per parsed page, in KiB"""
+    held_tree(parser, html)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    trees = [held_tree(parser, html) for _ in range(pages)]
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (after - before) / len(trees)
+
+
+def measure_memory(parser, pages):
+    output = subprocess.run(
+        [sys.executable, __file__, '--memory-probe', parser, '--pages', str(pages)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=500, help='pages parsed per timing and memory run')
+    parser.add_argument('--memory-probe', choices=PARSERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    page = fixtures['amazon_reviews_page.html']
+
+    if args.memory_probe:
+        print(memory_probe(args.memory_probe, page, args.pages))
+        return
+
+    # The edge-case fixture makes the parsers print skipped reviews; keep that out of the JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        mismatches = check_parity(fixtures)
+
+    results = {'fixtures': list(fixtures), 'mismatches': mismatches, 'parsers': {}}
+    for name in PARSERS:
+        parse(name, page)
+        start = time.perf_counter()
+        for _ in range(args.pages):
+            parse(name, page)
+        seconds = time.perf_counter() - start
+
+        results['parsers'][name] = {
+            'pages_per_second': args.pages / seconds,
+            'ms_per_page': seconds * 1000 / args.pages,
+            'kib_per_page': measure_memory(name, args.pages),
+        }
+
+    legacy = results['parsers']['legacy']['pages_per_second']
+    for name, stats in results['parsers'].items():
+        stats['speedup'] = stats['pages_per_second'] / legacy
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
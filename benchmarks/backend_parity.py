@@ -0,0 +1,66 @@
+"""
+Compare an inference backend against the fp32 PyTorch reference.
+
+Scores every review in a review JSON file with both backends and reports how
+far the candidate's probabilities drift, how often the sentiment label
+changes, and the throughput of each.
+
+    python benchmarks/backend_parity.py --backend quantized
+    python benchmarks/backend_parity.py --backend onnx --reviews data/B0XXXX_reviews.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from analyzer import SentimentAnalyzer
+
+
+def score(analyzer, texts):
+    # Warm up first so one-off initialisation isn't counted against the backend
+    analyzer._run_model(texts[:analyzer.batch_size])
+
+    start = time.perf_counter()
+    results = analyzer._run_model(texts)
+    elapsed = time.perf_counter() - start
+    return results, len(texts) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backend', default='quantized', help='backend to compare against fp32 torch')
+    parser.add_argument('--reviews', default=os.path.join(os.path.dirname(__file__), '..', 'B0CRMZ9PFR_reviews.json'))
+    parser.add_argument('--max-drift', type=float, default=0.05,
+                        help='fail if any positive probability moves by more than this')
+    args = parser.parse_args()
+
+    with open(args.reviews) as f:
+        texts = [review['text'] for review in json.load(f) if review.get('text')]
+
+    reference, reference_rate = score(SentimentAnalyzer(backend='torch'), texts)
+    candidate, candidate_rate = score(SentimentAnalyzer(backend=args.backend), texts)
+
+    drifts = [abs(r['positive_score'] - c['positive_score']) for r, c in zip(reference, candidate)]
+    label_changes = sum(r['sentiment'] != c['sentiment'] for r, c in zip(reference, candidate))
+
+    report = {
+        'backend': args.backend,
+        'reviews': len(texts),
+        'max_abs_drift': max(drifts),
+        'mean_abs_drift': sum(drifts) / len(drifts),
+        'label_agreement': 1 - label_changes / len(texts),
+        'reference_reviews_per_second': reference_rate,
+        'candidate_reviews_per_second': candidate_rate,
+        'speedup': candidate_rate / reference_rate,
+    }
+    print(json.dumps(report, indent=2))
+
+    if report['max_abs_drift'] > args.max_drift:
+        sys.exit(f"Positive probability drifted by {report['max_abs_drift']:.4f} (limit {args.max_drift})")
+
+
+if __name__ == '__main__':
+    main()
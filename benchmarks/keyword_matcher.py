@@ -0,0 +1,58 @@
+"""
+Benchmark the compiled keyword matcher against the original per-keyword scan.
+
+Runs both over the same seeded mock reviews, prints the time each takes and
+how many reviews they classify differently (the compiled matcher only matches
+whole words, so e.g. "later" no longer counts as "late").
+
+    python benchmarks/keyword_matcher.py --reviews 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from crawler import ReviewCrawler
+from keywords import KeywordMatcher
+
+
+def legacy_keyword_count(text):
+    """The substring scan _is_product_related used before KeywordMatcher"""
+    shipping_keywords = [
+        "shipping", "delivery", "arrived", "package", "box", "damaged",
+        "return", "refund", "customer service", "late", "delay"
+    ]
+    return sum(1 for keyword in shipping_keywords if keyword.lower() in text.lower())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reviews', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    texts = [review['text'] for review in ReviewCrawler()._generate_mock_reviews(args.reviews, seed=args.seed)]
+    matcher = KeywordMatcher()
+
+    start = time.perf_counter()
+    legacy = [legacy_keyword_count(text) for text in texts]
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = [len(match["keywords"]) for match in matcher.match_batch(texts)]
+    compiled_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        'reviews': len(texts),
+        'legacy_seconds': legacy_seconds,
+        'compiled_seconds': compiled_seconds,
+        'speedup': legacy_seconds / compiled_seconds,
+        'reviews_with_different_counts': sum(a != b for a, b in zip(legacy, compiled)),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
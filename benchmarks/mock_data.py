@@ -0,0 +1,84 @@
+"""
+Benchmark the vectorized mock review generator against the crawler's per-review loop.
+
+Generates the same number of seeded reviews with both, prints the time each
+takes and summary statistics of what they produced (rating shares, verified
+share, how many reviews got a product comment or a generic title, average
+length), which should agree to within sampling noise. Also times writing
+--write-count reviews to a JSON file in chunks.
+
+    python benchmarks/mock_data.py --reviews 200000 --write-count 1000000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from crawler import ReviewCrawler
+from mock_data import generate_reviews, write_reviews
+
+
+def distribution(reviews):
+    count = len(reviews)
+    ratings = Counter(review['rating'] for review in reviews)
+    return {
+        'ratings': {str(rating): ratings[rating] / count for rating in sorted(ratings)},
+        'verified': sum(review['verified'] for review in reviews) / count,
+        'product_comment': sum('As for the product itself' in review['text'] for review in reviews) / count,
+        'generic_title': sum(not review['text'].startswith(review['title'].rstrip('.')) for review in reviews) / count,
+        'mean_words': sum(len(review['text'].split()) for review in reviews) / count,
+        'distinct_dates': len({review['date'] for review in reviews}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reviews', type=int, default=200000)
+    parser.add_argument('--write-count', type=int, default=1000000, help='reviews written to disk (0 to skip)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    # Keep the crawler's progress message out of the JSON
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy = ReviewCrawler()._generate_mock_reviews(args.reviews, seed=args.seed)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = generate_reviews(args.reviews, seed=args.seed)
+    vectorized_seconds = time.perf_counter() - start
+
+    results = {
+        'reviews': args.reviews,
+        'legacy_seconds': legacy_seconds,
+        'vectorized_seconds': vectorized_seconds,
+        'speedup': legacy_seconds / vectorized_seconds,
+        'legacy_distribution': distribution(legacy),
+        'vectorized_distribution': distribution(vectorized),
+    }
+
+    if args.write_count:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'reviews.json')
+            start = time.perf_counter()
+            write_reviews(path, args.write_count, seed=args.seed)
+            seconds = time.perf_counter() - start
+            results['write'] = {
+                'reviews': args.write_count,
+                'seconds': seconds,
+                'reviews_per_second': args.write_count / seconds,
+                'bytes': os.path.getsize(path),
+            }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Measure how sharded inference throughput scales with the number of worker processes.
+
+Scores the same set of mock reviews with a single in-process analyzer (using
+all torch threads) and with ParallelSentimentAnalyzer at 1, 2, 4, ... workers
+up to the number of cores, and prints reviews/second for each.
+
+    python benchmarks/parallel_scaling.py --reviews 2000 --threads-per-worker 1
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from analyzer import SentimentAnalyzer
+from crawler import ReviewCrawler
+from parallel import ParallelSentimentAnalyzer
+
+
+def throughput(analyzer, reviews):
+    # Warm up first so one-off initialisation isn't measured
+    analyzer.score_reviews(reviews[:64])
+
+    start = time.perf_counter()
+    analyzer.score_reviews(reviews)
+    return len(reviews) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reviews', type=int, default=2000, help='number of mock reviews to score')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    reviews = ReviewCrawler()._generate_mock_reviews(args.reviews, seed=args.seed)
+
+    results = {'reviews': len(reviews), 'workers': {}}
+
+    workers = 1
+    while workers <= args.max_workers:
+        analyzer = ParallelSentimentAnalyzer(workers=workers, intra_op_threads=args.threads_per_worker)
+        results['workers'][workers] = throughput(analyzer, reviews)
+        analyzer.close()
+        workers *= 2
+
+    # Measured last: running inference in this process before the pools
+    # fork their workers is what ParallelSentimentAnalyzer avoids
+    results['single_process'] = throughput(SentimentAnalyzer(), reviews)
+
+    baseline = results['workers'][1]
+    print(f"single process: {results['single_process']:8.1f} reviews/s")
+    for count, rate in results['workers'].items():
+        print(f"{count:>3} workers: {rate:8.1f} reviews/s ({rate / baseline:.2f}x)")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark the columnar review store against the per-product JSON files it replaced.
+
+Writes the same seeded mock reviews for a number of products both ways
+(json.dump with indent=2, and ReviewStore.append) into a temporary directory,
+then times loading one product's reviews, scanning the ratings of every
+product, and re-ingesting a crawl that is already stored.
+
+    python benchmarks/review_store.py --products 50 --reviews 2000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from crawler import ReviewCrawler
+from review_store import ReviewStore
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=50)
+    parser.add_argument('--reviews', type=int, default=2000, help='reviews per product')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    crawler = ReviewCrawler()
+    products = {}
+    for number in range(args.products):
+        reviews = crawler._generate_mock_reviews(args.reviews, seed=args.seed + number)
+        for index, review in enumerate(reviews):
+            review['id'] = f'R{number}-{index}'
+        products[f'P{number:04d}'] = reviews
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_dir = os.path.join(tmp, 'json')
+        os.makedirs(json_dir)
+        store = ReviewStore(os.path.join(tmp, 'store'))
+
+        def write_json():
+            for product_id, reviews in products.items():
+                with open(os.path.join(json_dir, f'{product_id}_reviews.json'), 'w') as f:
+                    json.dump(reviews, f, indent=2)
+
+        def write_store():
+            for product_id, reviews in products.items():
+                store.append(product_id, reviews)
+
+        def load_json(product_id):
+            with open(os.path.join(json_dir, f'{product_id}_reviews.json')) as f:
+                return json.load(f)
+
+        def scan_json():
+            return {product_id: [review['rating'] for review in load_json(product_id)] for product_id in products}
+
+        def scan_store():
+            return {product_id: columns['rating'] for product_id, columns in store.scan(('rating',))}
+
+        product_id = next(iter(products))
+        results = {'products': args.products, 'reviews_per_product': args.reviews}
+        results['write_seconds'] = {'json': timed(write_json)[0], 'store': timed(write_store)[0]}
+        results['reingest_seconds'] = {'store': timed(write_store)[0]}
+        results['load_one_product_seconds'] = {
+            'json': timed(lambda: load_json(product_id))[0],
+            'store': timed(lambda: store.load(product_id))[0],
+        }
+        json_scan_seconds, json_ratings = timed(scan_json)
+        store_scan_seconds, store_ratings = timed(scan_store)
+        results['scan_ratings_seconds'] = {'json': json_scan_seconds, 'store': store_scan_seconds}
+        results['disk_bytes'] = {'json': directory_size(json_dir), 'store': directory_size(store.directory)}
+        results['stored_reviews'] = sum(store.count(product_id) for product_id in products)
+        results['identical_load'] = store.load(product_id) == load_json(product_id)
+        results['identical_ratings'] = all(
+            list(store_ratings[product_id]) == json_ratings[product_id] for product_id in products
+        )
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+"""
+Run the benchmark suite and write machine-readable results, or compare two result files.
+
+Stages (all on seeded mock reviews or recorded fixtures, so runs are
+repeatable and need no network):
+
+  model_load        loading the analyzer and its warm-up inference
+  inference_single  one review per forward pass (latency percentiles)
+  inference_batched forward passes over batches of each --batch-sizes
+  summary           per-review summaries (Summarizer, lead mode)
+  keywords          non-product keyword matching (KeywordMatcher)
+  crawl             Amazon and Walmart crawls against a local stub server, also
+                    repeated through an HTTP cache (fresh hits and 304 revalidation)
+  end_to_end        POST /analyze/stream through the Flask app, crawling the stub server
+
+The /analyze job route hands work to separate worker processes that can't be
+pointed at the stub server, so end-to-end latency is measured on the
+streaming route, which runs the same crawl and analysis in-process.
+
+    python benchmarks/run.py --output before.json
+    python benchmarks/run.py --output after.json
+    python benchmarks/run.py --compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+# Measure the model, not the sentiment cache, and load it only when asked to
+os.environ.setdefault('SENTIMENT_CACHE_SIZE', '0')
+os.environ.setdefault('PRELOAD_MODEL', '0')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+import http_client
+from crawler import AmazonReviewCrawler, ReviewCrawler, WalmartReviewCrawler
+from http_cache import HttpCache
+from stub_server import StubServer
+
+STAGES = ('model_load', 'inference_single', 'inference_batched', 'summary', 'keywords', 'crawl', 'end_to_end')
+
+
+def latency_stats(seconds):
+    """Percentiles (in milliseconds) of a list of timings in seconds"""
+    ms = np.asarray(seconds) * 1000
+    return {
+        'samples': len(ms),
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+    }
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def unlimited_rate_limiter():
+    # The stub server is local; the politeness limit would only measure itself
+    return http_client.HostRateLimiter(rate=1e9, burst=1e9, jitter=0)
+
+
+def bench_model_load(args, state):
+    from analyzer import SentimentAnalyzer
+
+    load_seconds, analyzer = timed(lambda: SentimentAnalyzer(backend=args.backend))
+    warmup_seconds, _ = timed(analyzer.warm_up)
+    state['analyzer'] = analyzer
+    return {'load_seconds': load_seconds, 'warmup_seconds': warmup_seconds}
+
+
+def _analyzer(args, state):
+    if 'analyzer' not in state:
+        bench_model_load(args, state)
+    return state['analyzer']
+
+
+def bench_inference_single(args, state):
+    analyzer = _analyzer(args, state)
+    texts = state['texts'][:args.single_samples]
+    # _run_model goes straight to the model, skipping any sentiment cache
+    timings = [timed(analyzer._run_model, [text])[0] for text in texts]
+    return dict(latency_stats(timings), reviews_per_second=len(timings) / sum(timings))
+
+
+def bench_inference_batched(args, state):
+    analyzer = _analyzer(args, state)
+    texts = state['texts']
+    results = {}
+    for batch_size in args.batch_sizes:
+        batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+        timings = [timed(analyzer._run_model, batch, batch_size)[0] for batch in batches]
+        results[str(batch_size)] = dict(
+            latency_stats(timings),
+            per_review_ms=sum(timings) * 1000 / len(texts),
+            reviews_per_second=len(texts) / sum(timings),
+        )
+    return results
+
+
+def _repeat_stage(function, texts, repeats):
+    timings = [timed(function, texts)[0] for _ in range(repeats)]
+    return dict(latency_stats(timings), reviews_per_second=len(texts) * repeats / sum(timings))
+
+
+def bench_summary(args, state):
+    from summarizer import Summarizer
+
+    return _repeat_stage(Summarizer().summarize_batch, state['texts'], args.repeats)
+
+
+def bench_keywords(args, state):
+    from keywords import KeywordMatcher
+
+    return _repeat_stage(KeywordMatcher().match_batch, state['texts'], args.repeats)
+
+
+def _crawl(crawler, url, max_reviews, repeats, server):
+    timings = []
+    page_latencies = []
+    reviews = 0
+    requests_before = server.requests
+    for _ in range(repeats):
+        seconds, crawled = timed(crawler.crawl_reviews, url, max_reviews)
+        timings.append(seconds)
+        page_latencies.extend(crawler.page_latencies)
+        reviews += len(crawled)
+    results = dict(
+        latency_stats(timings),
+        reviews_per_second=reviews / sum(timings),
+        pages_per_second=(server.requests - requests_before) / sum(timings),
+    )
+    if page_latencies:
+        # Requests the crawler actually sent (cache hits don't count)
+        results['page_request'] = latency_stats(page_latencies)
+    return results
+
+
+def _cached_crawl(kwargs, url, max_reviews, repeats, server, ttl):
+    """Repeat crawls of the same product through an HTTP cache primed by one crawl"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = HttpCache(os.path.join(tmp, 'http_cache.sqlite'), ttl=ttl)
+        AmazonReviewCrawler(http_cache=cache, **kwargs).crawl_reviews(url, max_reviews)
+        crawler = AmazonReviewCrawler(http_cache=cache, **kwargs)
+        results = _crawl(crawler, url, max_reviews, repeats, server)
+        results['hit_ratio'] = crawler.cache_stats.to_dict()['hit_ratio']
+        return results
+
+
+def bench_crawl(args, state):
+    with StubServer(latency=args.stub_latency) as server:
+        kwargs = dict(base_url=server.base_url, rate_limiter=unlimited_rate_limiter())
+        amazon_url = 'https://www.amazon.com/dp/BENCH00001'
+        return {
+            'amazon': _crawl(AmazonReviewCrawler(**kwargs), amazon_url, args.crawl_reviews, args.repeats, server),
+            'walmart': _crawl(WalmartReviewCrawler(**kwargs), 'https://www.walmart.com/ip/123456789',
+                              args.crawl_reviews, args.repeats, server),
+            'amazon_cached': _cached_crawl(kwargs, amazon_url, args.crawl_reviews, args.repeats, server, ttl=3600),
+            # Every page is stale, so each one is a conditional request answered with 304
+            'amazon_revalidated': _cached_crawl(kwargs, amazon_url, args.crawl_reviews, args.repeats, server, ttl=0),
+        }
+
+
+def bench_end_to_end(args, state):
+    import app as app_module
+    from model_registry import registry
+    from review_store import ReviewStore
+
+    load_seconds, _ = timed(registry.preload)
+    client = app_module.app.test_client()
+
+    with StubServer(latency=args.stub_latency) as server, tempfile.TemporaryDirectory() as tmp:
+        # Route the app's crawls to the stub server and keep its writes out of data/
+        AmazonReviewCrawler.default_base_url = server.base_url
+        http_client.rate_limiter = unlimited_rate_limiter()
+        app_module._review_store = ReviewStore(tmp)
+
+        totals = []
+        first_partial = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            response = client.post('/analyze/stream', data={'product_url': 'https://www.amazon.com/dp/BENCH00001'},
+                                   buffered=False)
+            seen_partial = False
+            for line in response.response:
+                event = json.loads(line)
+                if event['type'] == 'partial' and not seen_partial:
+                    first_partial.append(time.perf_counter() - start)
+                    seen_partial = True
+                elif event['type'] == 'error':
+                    raise RuntimeError(f"/analyze/stream failed: {event['error']}")
+            totals.append(time.perf_counter() - start)
+
+    return {
+        'model_load_seconds': load_seconds,
+        'total': latency_stats(totals),
+        'first_partial': latency_stats(first_partial),
+    }
+
+
+def run_metadata(args):
+    def git(*command):
+        try:
+            return subprocess.run(['git', *command], capture_output=True, text=True, timeout=10,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    import torch
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'torch': torch.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'args': {name: value for name, value in vars(args).items() if name not in ('output', 'compare')},
+    }
+
+
+def run(args):
+    state = {
+        'texts': [review['text'] for review in ReviewCrawler()._generate_mock_reviews(args.reviews, seed=args.seed)]
+    }
+    benchmarks = {name: globals()[f'bench_{name}'] for name in STAGES}
+
+    results = {}
+    for name in args.stages:
+        print(f'Running {name}...', file=sys.stderr)
+        results[name] = benchmarks[name](args, state)
+    return {'meta': run_metadata(args), 'results': results}
+
+
+def _flatten(results, prefix=''):
+    for name, value in results.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f'{prefix}{name}.')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and name != 'samples':
+            yield f'{prefix}{name}', value
+
+
+def compare(base_path, new_path):
+    """Print every metric of two result files side by side, marking improvements and regressions"""
+    with open(base_path) as f:
+        base = dict(_flatten(json.load(f)['results']))
+    with open(new_path) as f:
+        new = dict(_flatten(json.load(f)['results']))
+
+    print(f"{'metric':<52} {'base':>12} {'new':>12} {'change':>9}")
+    for metric in sorted(base.keys() & new.keys()):
+        old_value, new_value = base[metric], new[metric]
+        change = (new_value - old_value) / old_value if old_value else 0.0
+        # Throughputs should go up, everything else (times) down
+        better = change > 0 if metric.endswith('_per_second') else change < 0
+        flag = '' if abs(change) < 0.05 else ('  better' if better else '  WORSE')
+        print(f'{metric:<52} {old_value:>12.4g} {new_value:>12.4g} {change:>+8.1%}{flag}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--reviews', type=int, default=512, help='mock reviews used by the inference and text stages')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--backend', default='torch')
+    parser.add_argument('--single-samples', type=int, default=100)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--repeats', type=int, default=5, help='runs of the text, crawl and end-to-end stages')
+    parser.add_argument('--crawl-reviews', type=int, default=200, help='reviews per benchmark crawl')
+    parser.add_argument('--stub-latency', type=float, default=0.02, help='seconds the stub server adds per request')
+    parser.add_argument('--output', help='write results here instead of stdout')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='compare two result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
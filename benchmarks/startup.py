@@ -0,0 +1,129 @@
+"""
+Benchmark web app cold start: time until the health endpoint answers.
+
+Starts the app in fresh processes (the model is not preloaded) and reports
+how long importing it takes, which heavy modules the import pulled in, and
+the time from launching the process to the first /status/live response,
+over --runs runs. With --ready it also starts the app with
+PRELOAD_MODEL=background and reports when /status/ready turns 200 (model
+loaded) while /status/live already answers. Exits with status 1 if the
+median time to /status/live exceeds --budget seconds.
+
+    python benchmarks/startup.py --runs 5 --budget 1.0 --ready
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+HEAVY_MODULES = ('torch', 'transformers', 'bs4', 'lxml', 'tqdm', 'numpy')
+
+# Run in the child: import the app, report what that cost, then serve it on a free port
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app
+import_seconds = time.perf_counter() - start
+from werkzeug.serving import make_server
+server = make_server('127.0.0.1', 0, app.app, threaded=True)
+print(json.dumps({
+    'port': server.port,
+    'import_seconds': import_seconds,
+    'heavy_modules': [name for name in %r if name in sys.modules],
+}), flush=True)
+server.serve_forever()
+""" % (HEAVY_MODULES,)
+
+
+def get_status(port, path):
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+
+def wait_for(port, path, started, timeout):
+    """Seconds from process launch until the path answers 200"""
+    while time.perf_counter() - started < timeout:
+        if get_status(port, path) == 200:
+            return time.perf_counter() - started
+        time.sleep(0.01)
+    return None
+
+
+def start_app(preload):
+    env = dict(os.environ, PRELOAD_MODEL=preload)
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-c', CHILD], cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    info = json.loads(process.stdout.readline())
+    return process, started, info
+
+
+def cold_start(timeout):
+    process, started, info = start_app('0')
+    try:
+        info['live_seconds'] = wait_for(info['port'], '/status/live', started, timeout)
+        info['ready_status'] = get_status(info['port'], '/status/ready')
+    finally:
+        process.terminate()
+        process.wait()
+    return info
+
+
+def background_preload(timeout):
+    process, started, info = start_app('background')
+    try:
+        live = wait_for(info['port'], '/status/live', started, timeout)
+        return {
+            'live_seconds': live,
+            # Usually 503 (loading) at this point
+            'ready_status_when_live': get_status(info['port'], '/status/ready'),
+            'ready_seconds': wait_for(info['port'], '/status/ready', started, timeout),
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=1.0, help='seconds allowed until /status/live answers')
+    parser.add_argument('--ready', action='store_true', help='also time a background model preload')
+    parser.add_argument('--timeout', type=float, default=300.0)
+    args = parser.parse_args()
+
+    runs = [cold_start(args.timeout) for _ in range(args.runs)]
+    live = statistics.median(run['live_seconds'] for run in runs)
+    results = {
+        'runs': args.runs,
+        'import_seconds': statistics.median(run['import_seconds'] for run in runs),
+        'live_seconds': live,
+        'live_seconds_max': max(run['live_seconds'] for run in runs),
+        'heavy_modules_imported': runs[0]['heavy_modules'],
+        'ready_status_without_preload': runs[0]['ready_status'],
+        'budget_seconds': args.budget,
+        'within_budget': live <= args.budget,
+    }
+    if args.ready:
+        results['background_preload'] = background_preload(args.timeout)
+
+    print(json.dumps(results, indent=2))
+    if not results['within_budget']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
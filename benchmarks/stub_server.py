@@ -0,0 +1,135 @@
+"""
+Local stand-in for the Amazon and Walmart review endpoints, serving the
+recorded pages in benchmarks/fixtures so crawls can be benchmarked offline.
+
+    python benchmarks/stub_server.py --port 8000 --latency 0.05
+
+then point a crawler at it, e.g. AmazonReviewCrawler(base_url='http://127.0.0.1:8000').
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_fixtures():
+    with open(os.path.join(FIXTURES_DIR, 'amazon_reviews_page.html')) as f:
+        amazon_page = f.read()
+    with open(os.path.join(FIXTURES_DIR, 'walmart_reviews.json')) as f:
+        walmart_reviews = json.load(f)
+    return amazon_page, walmart_reviews
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server.stub
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        server.count_request()
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        if url.path.startswith('/product-reviews/'):
+            page = int(query.get('pageNumber', ['1'])[0])
+            # Give every page its own review ids
+            body = server.amazon_page.replace('__PAGE__', str(page)).replace('__NEXT__', str(page + 1))
+            self._send(200, 'text/html; charset=utf-8', body.encode('utf-8'))
+        elif url.path.startswith('/reviews/api/product/'):
+            page = int(query.get('page', ['1'])[0])
+            fixture = server.walmart_reviews
+            pagination = fixture.get('pagination', {})
+            total = pagination.get('total', len(fixture['reviews']))
+            # Pages of up to `limit` reviews (at most the fixture's), none past the total
+            limit = min(int(query.get('limit', ['60'])[0]), len(fixture['reviews']))
+            count = max(0, min(limit, total - (page - 1) * limit))
+            data = dict(fixture, reviews=[
+                dict(review, reviewId=review['reviewId'] + page * 1000) for review in fixture['reviews'][:count]
+            ])
+            data['pagination'] = dict(pagination, pageSize=limit, currentPage=page)
+            self._send(200, 'application/json', json.dumps(data).encode('utf-8'))
+        else:
+            self._send(404, 'text/plain', b'not found')
+
+    def _send(self, status, content_type, body):
+        # Validators so crawlers with an HTTP cache can revalidate (the fixtures never change)
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            status, body = 304, b''
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', self.server.stub.last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """Serves the review fixtures on a local port, optionally adding a fixed latency per request"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        self.amazon_page, self.walmart_reviews = load_fixtures()
+        self.latency = latency
+        self.last_modified = formatdate(usegmt=True)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    args = parser.parse_args()
+
+    server = StubServer(port=args.port, latency=args.latency)
+    print(f'Serving review fixtures on {server.base_url}')
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
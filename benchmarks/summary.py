@@ -0,0 +1,77 @@
+"""
+Benchmark review summarization against the original _generate_summary.
+
+Builds multi-sentence texts from seeded mock reviews, summarizes them with the
+original split-on-'.' implementation and with summarizer.Summarizer (lead
+mode, no model needed), and prints the time each takes and how many
+summaries differ. Some differences are expected: the original treated every
+'.' as a sentence end and added a full stop after '!' ("great!.").
+
+    python benchmarks/summary.py --reviews 50000 --join 3
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from crawler import ReviewCrawler
+from summarizer import Summarizer
+
+
+def legacy_summary(text, max_words=50):
+    """The summary SentimentAnalyzer._generate_summary built before Summarizer"""
+    sentences = text.split('.')
+    summary = ""
+    word_count = 0
+
+    for sentence in sentences:
+        if not sentence.strip():
+            continue
+
+        words = sentence.split()
+        if word_count + len(words) <= max_words:
+            summary += sentence.strip() + ". "
+            word_count += len(words)
+        else:
+            remaining_words = max_words - word_count
+            if remaining_words > 0:
+                summary += " ".join(words[:remaining_words]) + "..."
+            break
+
+    return summary.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reviews', type=int, default=50000)
+    parser.add_argument('--join', type=int, default=3, help='mock review texts joined into each text')
+    parser.add_argument('--max-words', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    mock_texts = [review['text'] for review in ReviewCrawler()._generate_mock_reviews(args.reviews * args.join, seed=args.seed)]
+    texts = [" ".join(mock_texts[start:start + args.join]) for start in range(0, len(mock_texts), args.join)]
+    summarizer = Summarizer(max_words=args.max_words)
+
+    start = time.perf_counter()
+    legacy = [legacy_summary(text, args.max_words) for text in texts]
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = summarizer.summarize_batch(texts)
+    batched_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        'reviews': len(texts),
+        'legacy_seconds': legacy_seconds,
+        'summarizer_seconds': batched_seconds,
+        'speedup': legacy_seconds / batched_seconds,
+        'different_summaries': sum(a != b for a, b in zip(legacy, batched)),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
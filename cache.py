@@ -0,0 +1,96 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class SentimentCache:
+    """LRU cache of sentiment results keyed by normalized review text and model"""
+
+    def __init__(self, max_entries=10000, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Optional SQLite store so results survive restarts
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sentiment_cache (key TEXT PRIMARY KEY, result TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(text, model_name):
+        """Hash the text (with whitespace collapsed) together with the model name"""
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{model_name}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        """Return a dict of key -> result for the keys that are cached"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+
+            missing = [key for key in set(keys) if key not in found]
+            if self._db is not None and missing:
+                for key, result in self._load_from_disk(missing):
+                    found[key] = result
+                    self._remember(key, result)
+
+            for key in keys:
+                if key in found:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+
+        return found
+
+    def put_many(self, items):
+        """Store a dict of key -> result"""
+        with self._lock:
+            for key, result in items.items():
+                self._remember(key, result)
+
+            if self._db is not None and items:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO sentiment_cache (key, result) VALUES (?, ?)",
+                    [(key, json.dumps(result)) for key, result in items.items()]
+                )
+                self._db.commit()
+
+    def _remember(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load_from_disk(self, keys):
+        # Stay well under SQLite's limit on bound parameters
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._db.execute(
+                f"SELECT key, result FROM sentiment_cache WHERE key IN ({placeholders})", chunk
+            )
+            for key, result in rows:
+                yield key, json.loads(result)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "persistent": self._db is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
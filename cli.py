@@ -0,0 +1,230 @@
+"""
+Analyze many products in one run, without the web server.
+
+Each input is a product URL, an Amazon product id (ASIN) or a saved review
+JSON file (a list of reviews, e.g. B0CRMZ9PFR_reviews.json). Products are
+crawled concurrently while the model, loaded once, scores the reviews of
+several products per batch. One JSON line is written per product and a
+timing summary goes to stderr.
+
+    python cli.py B0CRMZ9PFR https://www.walmart.com/ip/123 old/B0B1_reviews.json -o results.ndjson
+    python cli.py --input-file products.txt --crawl-workers 8 -o nightly.ndjson
+"""
+import argparse
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+from tqdm import tqdm
+
+load_dotenv()
+
+from aggregates import ResultAccumulator
+from crawler import get_crawler_for_url, product_id_from_url
+import metrics
+from model_registry import registry
+from review_store import ReviewStore
+
+data_dir = os.path.join(os.path.dirname(__file__), 'data')
+
+
+def parse_source(item, stored=False):
+    """Turn one input into (kind, location, product_id)"""
+    if item.endswith('.json'):
+        name = os.path.basename(item)[:-len('.json')]
+        return 'file', item, name[:-len('_reviews')] if name.endswith('_reviews') else name
+    if item.startswith(('http://', 'https://')):
+        return 'url', item, product_id_from_url(item)
+    if stored:
+        return 'store', item, item
+    return 'url', f'https://www.amazon.com/dp/{item}', item
+
+
+def fetch_reviews(source, max_reviews, store, save=True):
+    """Crawl or read the reviews of one product, returning (reviews, seconds, HTTP cache stats or None)"""
+    kind, location, product_id = source
+    start = time.perf_counter()
+    cache_stats = None
+    if kind == 'file':
+        with open(location) as f:
+            reviews = json.load(f)
+    elif kind == 'store':
+        reviews = store.load(product_id)
+    else:
+        crawler = get_crawler_for_url(location)
+        reviews = crawler.crawl_reviews(location, max_reviews=max_reviews)
+        if crawler.http_cache is not None:
+            cache_stats = crawler.cache_stats.to_dict()
+        if reviews and save:
+            store.append(product_id, reviews)
+    return reviews, time.perf_counter() - start, cache_stats
+
+
+class BatchAnalyzer:
+    """Scores the reviews of several products together and splits the results back out"""
+
+    def __init__(self, analyzer, batch_reviews, details=False):
+        self.analyzer = analyzer
+        self.batch_reviews = batch_reviews
+        self.details = details
+        self.pending = []
+        self.pending_reviews = 0
+        self.analyze_seconds = 0.0
+        self.reviews_analyzed = 0
+
+    def add(self, record, reviews):
+        """Queue a product, returning the records of any products finished as a result"""
+        self.pending.append((record, reviews))
+        self.pending_reviews += len(reviews)
+        if self.pending_reviews >= self.batch_reviews:
+            return self.flush()
+        return []
+
+    def flush(self):
+        if not self.pending:
+            return []
+
+        pending, self.pending, self.pending_reviews = self.pending, [], 0
+        all_reviews = [review for _, reviews in pending for review in reviews]
+
+        start = time.perf_counter()
+        scored_reviews = self.analyzer.score_reviews(all_reviews)
+        seconds = time.perf_counter() - start
+        self.analyze_seconds += seconds
+        self.reviews_analyzed += len(all_reviews)
+
+        records = []
+        offset = 0
+        for record, reviews in pending:
+            # Without --details the rows are dropped, so don't keep any
+            accumulator = ResultAccumulator(self.analyzer.max_detail_rows if self.details else 0)
+            accumulator.add_many(scored_reviews[offset:offset + len(reviews)])
+            offset += len(reviews)
+
+            results = self.analyzer.build_results(
+                accumulator.totals, accumulator.detailed_analysis, accumulator.omitted_rows
+            )
+            if not self.details:
+                del results['detailed_analysis']
+
+            # The batch's time is shared out by review count
+            record['analyze_seconds'] = seconds * len(reviews) / len(all_reviews)
+            record['results'] = results
+            records.append(record)
+        return records
+
+
+def run(sources, output, store, max_reviews=500, crawl_workers=4, batch_reviews=256, details=False, save=True):
+    """Analyze every source, writing one JSON line per product to output, and return the run summary"""
+    with metrics.collect() as timings:
+        summary = _run(sources, output, store, max_reviews, crawl_workers, batch_reviews, details, save)
+    # Summed over threads and worker processes, like fetch_seconds
+    summary['timings'] = timings.to_dict()
+    return summary
+
+
+def _run(sources, output, store, max_reviews, crawl_workers, batch_reviews, details, save):
+    started = time.perf_counter()
+
+    start = time.perf_counter()
+    analyzer = registry.preload()
+    load_seconds = time.perf_counter() - start
+
+    batcher = BatchAnalyzer(analyzer, batch_reviews, details)
+    fetch_seconds = 0.0
+    summary = {'products': len(sources), 'succeeded': 0, 'failed': 0, 'reviews': 0}
+
+    def write(record):
+        output.write(json.dumps(record) + '\n')
+        summary['succeeded' if 'results' in record else 'failed'] += 1
+
+    with ThreadPoolExecutor(max_workers=crawl_workers) as executor:
+        futures = {
+            executor.submit(contextvars.copy_context().run, fetch_reviews, source, max_reviews, store, save): source
+            for source in sources
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Products", file=sys.stderr):
+            kind, location, product_id = futures[future]
+            record = {'input': location, 'product_id': product_id}
+            try:
+                reviews, seconds, cache_stats = future.result()
+            except Exception as e:
+                write(dict(record, error=str(e)))
+                continue
+
+            fetch_seconds += seconds
+            record.update(reviews=len(reviews), fetch_seconds=seconds)
+            if cache_stats is not None:
+                record['http_cache'] = cache_stats
+            if not reviews:
+                write(dict(record, error='No reviews found'))
+                continue
+
+            summary['reviews'] += len(reviews)
+            for finished in batcher.add(record, reviews):
+                write(finished)
+
+    for finished in batcher.flush():
+        write(finished)
+
+    wall_seconds = time.perf_counter() - started
+    summary.update(
+        model_load_seconds=load_seconds,
+        # Summed over products; crawls overlap, so this can exceed the wall time
+        fetch_seconds=fetch_seconds,
+        analyze_seconds=batcher.analyze_seconds,
+        wall_seconds=wall_seconds,
+        analyze_reviews_per_second=batcher.reviews_analyzed / batcher.analyze_seconds if batcher.analyze_seconds else 0.0,
+        reviews_per_second=summary['reviews'] / wall_seconds if wall_seconds else 0.0,
+    )
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('inputs', nargs='*', help='product URLs, Amazon product ids or review JSON files')
+    parser.add_argument('--input-file', help='file with one input per line')
+    parser.add_argument('-o', '--output', default='-', help='NDJSON output file (default: stdout)')
+    parser.add_argument('--max-reviews', type=int, default=500, help='reviews to crawl per product')
+    parser.add_argument('--crawl-workers', type=int, default=4, help='products crawled at the same time')
+    parser.add_argument('--batch-reviews', type=int, default=256,
+                        help='score reviews of several products together once this many are waiting')
+    parser.add_argument('--details', action='store_true', help='include per-review results')
+    parser.add_argument('--stored', action='store_true',
+                        help='read bare product ids from the review store instead of crawling them')
+    parser.add_argument('--no-store', action='store_true', help="don't add crawled reviews to the review store")
+    args = parser.parse_args(argv)
+
+    items = list(args.inputs)
+    if args.input_file:
+        with open(args.input_file) as f:
+            items.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    if not items:
+        parser.error('no inputs given')
+
+    sources = [parse_source(item, args.stored) for item in items]
+    store = ReviewStore(os.path.join(data_dir, 'reviews'))
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        # Keep crawler/model progress messages out of the NDJSON on stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            summary = run(
+                sources, output, store, max_reviews=args.max_reviews, crawl_workers=args.crawl_workers,
+                batch_reviews=args.batch_reviews, details=args.details, save=not args.no_store,
+            )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
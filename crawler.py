@@ -1,15 +1,42 @@
-import requests
 import random
 import json
-import time
 import datetime
-from bs4 import BeautifulSoup
-from tqdm import tqdm
+import hashlib
+import contextvars
+import math
+import statistics
+import time
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
+import metrics
+from http_cache import CacheStats
+
+# tqdm, the HTML parser (bs4/lxml) and the mock review tables (numpy) are
+# imported where they are used, so importing the crawler (as the web app
+# does at startup) stays cheap
 
 class ReviewCrawler:
     """Base class for review crawlers"""
     
-    def __init__(self):
+    default_base_url = None
+    
+    def __init__(self, base_url=None, session=None, rate_limiter=None, max_workers=None, http_cache=None):
+        # Overridable so the crawler can be pointed at a local stub server
+        self.base_url = base_url or self.default_base_url
+        
+        # Connection pool and per-host rate limit shared by all crawlers
+        self.session = session or http_client.session
+        self.rate_limiter = rate_limiter or http_client.rate_limiter
+        self.max_workers = max_workers or http_client.max_workers
+        
+        # Cache of earlier responses (None when HTTP_CACHE_PATH isn't set)
+        self.http_cache = http_cache or http_client.response_cache
+        self.cache_stats = CacheStats()
+        # Seconds taken by each page request of the current crawl
+        self.page_latencies = []
+        
         # List of user agents to rotate through to avoid being blocked
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -24,87 +51,102 @@ class ReviewCrawler:
         """Get a random user agent from the list"""
         return random.choice(self.user_agents)
     
-    def _generate_mock_reviews(self, count=500):
-        """Generate mock reviews with diverse text and sentiments"""
-        # Lists of phrases to create diverse mock reviews
-        positive_phrases = [
-            "This product exceeded my expectations. The quality is outstanding.",
-            "I'm extremely satisfied with this purchase. It works perfectly.",
-            "Best purchase I've made in a long time. Highly recommend!",
-            "This is exactly what I was looking for. Great value for money.",
-            "Excellent product that delivers on all its promises.",
-            "I'm impressed with how well this works. Will buy again.",
-            "The quality is much better than I expected for the price.",
-            "This product has made my life so much easier. Love it!",
-            "Fantastic product with great attention to detail.",
-            "I've recommended this to all my friends. It's that good!",
-            "Surprisingly good quality for the price point.",
-            "This product is durable and well-designed. Very happy with it.",
-            "The customer service was excellent when I had questions.",
-            "This exceeded my expectations in every way possible.",
-            "I use this product daily and it has held up wonderfully."
-        ]
+    def _fetch(self, url, headers):
+        """
+        GET a URL through the shared session, waiting for the host's rate
+        limit. With an HTTP cache, fresh cached pages are returned without a
+        request and stale ones are revalidated.
+        """
+        cached = self.http_cache.get(url) if self.http_cache else None
+        if cached is not None and self.http_cache.is_fresh(cached):
+            self._record_cache("hits")
+            return cached.to_response()
         
-        negative_phrases = [
-            "Unfortunately, this product didn't meet my expectations.",
-            "I'm disappointed with the quality. It feels cheaply made.",
-            "This broke after just a few uses. Would not recommend.",
-            "Save your money and look elsewhere. Not worth it.",
-            "The description was misleading. Not what I expected at all.",
-            "Poor quality control. Mine arrived with defects.",
-            "This is overpriced for what you get. Not good value.",
-            "I had high hopes but was let down by this product.",
-            "Had to return this. It simply didn't work as advertised.",
-            "The design has some serious flaws that make it frustrating to use.",
-            "I regret this purchase and wouldn't buy it again.",
-            "The product is much smaller/larger than it appears in photos.",
-            "It worked for a week then completely stopped functioning.",
-            "The materials feel cheap and I worry about longevity.",
-            "This is the worst version of this product I've ever used."
-        ]
+        headers = dict(headers, **{'User-Agent': self._get_random_user_agent()})
+        if cached is not None:
+            headers.update(cached.conditional_headers())
         
-        neutral_phrases = [
-            "This product is okay. Nothing special but it works.",
-            "It does the job, but I've seen better options out there.",
-            "Average quality for the price. No complaints but not amazing.",
-            "It's a decent product with some room for improvement.",
-            "Some features are good, others could be better.",
-            "It's exactly what you'd expect for this price point.",
-            "The product works as described, but the design could be improved.",
-            "It's functional but lacks some of the premium features of competitors.",
-            "I have mixed feelings about this purchase.",
-            "It's fine for occasional use but I wouldn't rely on it daily.",
-            "Not bad, not great - just average in most respects.",
-            "It serves its purpose but doesn't exceed expectations.",
-            "The quality is acceptable but not impressive.",
-            "It's a basic version that works but lacks extras.",
-            "I'm neither disappointed nor impressed with this product."
-        ]
+        self.rate_limiter.wait(url)
+        metrics.increment("crawl_requests_total")
+        start = time.perf_counter()
+        with metrics.timer("crawl_request"):
+            response = self.session.get(url, headers=headers, timeout=10)
+        self.page_latencies.append(time.perf_counter() - start)
         
-        non_product_phrases = [
-            "The shipping was extremely slow. Took weeks to arrive.",
-            "Package arrived damaged but the seller quickly sent a replacement.",
-            "The customer service was terrible when I had an issue.",
-            "Delivery was faster than expected. Great service!",
-            "The box was damaged but luckily the product inside was fine.",
-            "Had issues with delivery but the company resolved it quickly.",
-            "The packaging was excessive and not environmentally friendly.",
-            "The product was left in the rain by the delivery person.",
-            "Great communication from the seller throughout the process.",
-            "The return process was simple and hassle-free.",
-            "Shipping took longer than the estimated delivery date.",
-            "The package was well protected and arrived in perfect condition.",
-            "Had to contact customer service twice before my issue was resolved.",
-            "The delivery person was very helpful and professional.",
-            "The tracking information was inaccurate throughout shipping."
-        ]
+        if self.http_cache is None:
+            return response
+        if response.status_code == 304 and cached is not None:
+            self.http_cache.refresh(url)
+            self._record_cache("revalidated")
+            return cached.to_response()
+        
+        self._record_cache("misses")
+        if self._is_cacheable(response):
+            self.http_cache.put(url, response)
+        return response
+    
+    def _is_cacheable(self, response):
+        """Whether a response is a real page worth keeping (not an error or a block page)"""
+        return response.status_code == 200
+    
+    def _record_cache(self, outcome):
+        self.cache_stats.record(outcome)
+        metrics.increment(f"http_cache_{outcome}_total")
+    
+    def _fetch_concurrently(self, urls, headers):
+        """
+        Fetch URLs on a thread pool (the rate limiter keeps the request rate
+        polite while network waits overlap), yielding their futures in order.
+        Closing the generator cancels the fetches that haven't started.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Each request runs in a copy of this context so its timing reaches the current analysis
+            futures = [executor.submit(contextvars.copy_context().run, self._fetch, url, headers) for url in urls]
+            try:
+                yield from futures
+            finally:
+                for future in futures:
+                    future.cancel()
+    
+    def _start_crawl(self):
+        """Reset the per-crawl cache counters and page latencies"""
+        self.cache_stats = CacheStats()
+        self.page_latencies = []
+    
+    def _report_crawl_stats(self):
+        if self.page_latencies:
+            latencies = sorted(self.page_latencies)
+            print(f"Page latency over {len(latencies)} requests: median {statistics.median(latencies) * 1000:.0f} ms, "
+                  f"max {latencies[-1] * 1000:.0f} ms")
+        if self.http_cache is not None:
+            stats = self.cache_stats.to_dict()
+            print(f"HTTP cache: {stats['hits']} fresh, {stats['revalidated']} revalidated, "
+                  f"{stats['misses']} downloaded ({stats['hit_ratio']:.0%} hit ratio)")
+    
+    def _generate_mock_reviews(self, count=500, seed=None):
+        """
+        Generate mock reviews with diverse text and sentiments. With a seed
+        the same reviews (including dates) are generated on every run.
+        mock_data.MockReviewGenerator generates large numbers much faster.
+        """
+        from mock_data import GENERIC_TITLES, PHRASES, SEEDED_TODAY, rating_bucket
+        
+        rng = random.Random(seed) if seed is not None else random
+        # Dates count back from a fixed day when seeded so they don't drift
+        today = SEEDED_TODAY if seed is not None else datetime.datetime.now()
+        
+        # Phrases to create diverse mock reviews from (shared with mock_data)
+        positive_phrases = PHRASES["positive"]
+        negative_phrases = PHRASES["negative"]
+        neutral_phrases = PHRASES["neutral"]
+        non_product_phrases = PHRASES["non_product"]
         
         reviews = []
         
         # Generate random reviews
         for _ in range(count):
             # Determine review type with weighted probabilities
-            review_type = random.choices(
+            review_type = rng.choices(
                 ['positive', 'negative', 'neutral', 'non_product'],
                 weights=[0.5, 0.3, 0.1, 0.1],
                 k=1
@@ -112,37 +154,37 @@ class ReviewCrawler:
             
             # Select base phrase based on review type
             if review_type == 'positive':
-                base_phrase = random.choice(positive_phrases)
-                rating = random.choices([4, 5], weights=[0.3, 0.7], k=1)[0]
+                base_phrase = rng.choice(positive_phrases)
+                rating = rng.choices([4, 5], weights=[0.3, 0.7], k=1)[0]
                 is_product_related = True
             elif review_type == 'negative':
-                base_phrase = random.choice(negative_phrases)
-                rating = random.choices([1, 2], weights=[0.7, 0.3], k=1)[0]
+                base_phrase = rng.choice(negative_phrases)
+                rating = rng.choices([1, 2], weights=[0.7, 0.3], k=1)[0]
                 is_product_related = True
             elif review_type == 'neutral':
-                base_phrase = random.choice(neutral_phrases)
-                rating = random.choices([3, 4], weights=[0.8, 0.2], k=1)[0]
+                base_phrase = rng.choice(neutral_phrases)
+                rating = rng.choices([3, 4], weights=[0.8, 0.2], k=1)[0]
                 is_product_related = True
             else:  # non_product
-                base_phrase = random.choice(non_product_phrases)
+                base_phrase = rng.choice(non_product_phrases)
                 # Non-product reviews can have any rating
-                rating = random.randint(1, 5)
+                rating = rng.randint(1, 5)
                 is_product_related = False
             
             # Add some randomness to the review text
-            if random.random() < 0.3 and is_product_related:
+            if rng.random() < 0.3 and is_product_related:
                 # Sometimes add a second phrase for more detail
                 if review_type == 'positive':
-                    second_phrase = random.choice(positive_phrases)
+                    second_phrase = rng.choice(positive_phrases)
                 elif review_type == 'negative':
-                    second_phrase = random.choice(negative_phrases)
+                    second_phrase = rng.choice(negative_phrases)
                 else:
-                    second_phrase = random.choice(neutral_phrases)
+                    second_phrase = rng.choice(neutral_phrases)
                 
                 review_text = f"{base_phrase} {second_phrase}"
-            elif random.random() < 0.2 and not is_product_related:
+            elif rng.random() < 0.2 and not is_product_related:
                 # Sometimes add a product comment to a non-product review
-                product_phrase = random.choice(positive_phrases if rating >= 4 else 
+                product_phrase = rng.choice(positive_phrases if rating >= 4 else 
                                               negative_phrases if rating <= 2 else
                                               neutral_phrases)
                 review_text = f"{base_phrase} As for the product itself: {product_phrase}"
@@ -150,24 +192,18 @@ class ReviewCrawler:
                 review_text = base_phrase
             
             # Generate a random date within the last year
-            days_ago = random.randint(1, 365)
-            review_date = (datetime.datetime.now() - datetime.timedelta(days=days_ago)).strftime('%B %d, %Y')
+            days_ago = rng.randint(1, 365)
+            review_date = (today - datetime.timedelta(days=days_ago)).strftime('%B %d, %Y')
             
             # Create review title (shorter version of the review or generic title)
-            if random.random() < 0.7:
+            if rng.random() < 0.7:
                 # Use first few words of review
                 words = review_text.split()
-                title_length = min(random.randint(3, 6), len(words))
+                title_length = min(rng.randint(3, 6), len(words))
                 review_title = ' '.join(words[:title_length]) + ('...' if len(words) > title_length else '')
             else:
                 # Generic titles based on sentiment
-                if rating >= 4:
-                    titles = ["Great product!", "Very satisfied", "Highly recommend", "Excellent purchase", "Love it!"]
-                elif rating <= 2:
-                    titles = ["Disappointed", "Not worth it", "Save your money", "Wouldn't recommend", "Regrettable purchase"]
-                else:
-                    titles = ["It's okay", "Decent product", "Average", "Not bad", "Does the job"]
-                review_title = random.choice(titles)
+                review_title = rng.choice(GENERIC_TITLES[rating_bucket(rating)])
             
             # Add the review
             reviews.append({
@@ -175,32 +211,56 @@ class ReviewCrawler:
                 'title': review_title,
                 'text': review_text,
                 'date': review_date,
-                'verified': random.random() < 0.8,  # 80% chance of being a verified purchase
+                'verified': rng.random() < 0.8,  # 80% chance of being a verified purchase
             })
         
         # Shuffle the reviews to mix up the order
-        random.shuffle(reviews)
+        rng.shuffle(reviews)
         
         print(f"Generated {len(reviews)} mock reviews")
         return reviews
     
-    def crawl_reviews(self, product_url, max_reviews=500):
+    def _mock_pages(self, count=500, page_size=50, seed=None):
+        """Generate mock reviews and hand them out in pages, like a real crawl"""
+        reviews = self._generate_mock_reviews(count, seed)
+        for start in range(0, len(reviews), page_size):
+            yield reviews[start:start + page_size]
+    
+    def iter_review_pages(self, product_url, max_reviews=500):
         """
-        Crawl reviews from the product URL
+        Crawl reviews from the product URL, yielding a list of reviews per page
         This method should be implemented by subclasses
         """
-        raise NotImplementedError("Subclasses must implement crawl_reviews")
+        raise NotImplementedError("Subclasses must implement iter_review_pages")
+    
+    def crawl_reviews(self, product_url, max_reviews=500):
+        """Crawl reviews from the product URL and return them as one list"""
+        reviews = []
+        for page in self.iter_review_pages(product_url, max_reviews):
+            reviews.extend(page)
+        return reviews
 
 class AmazonReviewCrawler(ReviewCrawler):
     """Crawler for Amazon product reviews"""
     
-    def crawl_reviews(self, product_url, max_reviews=500):
-        """Crawl reviews from Amazon product page"""
+    default_base_url = "https://www.amazon.com"
+    
+    def _is_cacheable(self, response):
+        # Amazon serves its captcha page with a 200
+        return super()._is_cacheable(response) and 'captcha' not in response.text.lower()
+    
+    def iter_review_pages(self, product_url, max_reviews=500):
+        """Crawl reviews from Amazon product page, yielding one page of reviews at a time"""
+        from amazon_parser import parse_review_page
+        from tqdm import tqdm
+        
         if 'amazon' not in product_url.lower():
             print("Not an Amazon URL. Generating mock reviews instead.")
-            return self._generate_mock_reviews(max_reviews)
+            yield from self._mock_pages(max_reviews)
+            return
             
         print(f"Crawling Amazon reviews for: {product_url}")
+        self._start_crawl()
         
         # Extract product ID from URL
         if '/dp/' in product_url:
@@ -209,51 +269,54 @@ class AmazonReviewCrawler(ReviewCrawler):
             product_id = product_url.split('/product/')[1].split('/')[0]
         else:
             print("Could not extract product ID from URL. Generating mock reviews instead.")
-            return self._generate_mock_reviews(max_reviews)
+            yield from self._mock_pages(max_reviews)
+            return
         
         # Construct the reviews URL
-        reviews_url = f"https://www.amazon.com/product-reviews/{product_id}/ref=cm_cr_dp_d_show_all_btm?ie=UTF8&reviewerType=all_reviews"
+        reviews_url = f"{self.base_url}/product-reviews/{product_id}/ref=cm_cr_dp_d_show_all_btm?ie=UTF8&reviewerType=all_reviews"
         
         # Get the first page of reviews
         headers = {
-            'User-Agent': self._get_random_user_agent(),
             'Accept-Language': 'en-US,en;q=0.9',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Connection': 'keep-alive',
             'Accept-Encoding': 'gzip, deflate, br',
         }
         
+        crawled = 0
+        
         try:
-            response = requests.get(reviews_url, headers=headers, timeout=10)
+            response = self._fetch(reviews_url, headers)
             
             # Check if we've been blocked
             if response.status_code != 200 or 'captcha' in response.text.lower():
                 print("Access to Amazon reviews blocked. Generating mock reviews instead.")
-                return self._generate_mock_reviews(max_reviews)
+                yield from self._mock_pages(max_reviews)
+                return
                 
-            html_content = response.text
-            
             # Parse HTML
-            soup = BeautifulSoup(html_content, 'html.parser')
+            with metrics.timer("parse"):
+                first_page = parse_review_page(response.text)
             
             # Check if there are any reviews
-            no_reviews_div = soup.select_one('div.a-row.a-spacing-medium.a-spacing-top-large > span')
-            if no_reviews_div and "There are no customer reviews yet" in no_reviews_div.text:
+            if first_page.no_reviews:
                 print("No reviews found for this product. Generating mock reviews instead.")
-                return self._generate_mock_reviews(max_reviews)
+                yield from self._mock_pages(max_reviews)
+                return
             
             # Extract total number of reviews
-            total_reviews_element = soup.select_one('div[data-hook="cr-filter-info-review-rating-count"]')
-            if not total_reviews_element:
+            total_reviews_text = first_page.total_reviews_text
+            if total_reviews_text is None:
                 print("Could not determine total number of reviews. Generating mock reviews instead.")
-                return self._generate_mock_reviews(max_reviews)
+                yield from self._mock_pages(max_reviews)
+                return
             
-            total_reviews_text = total_reviews_element.text.strip()
             try:
                 total_reviews = int(total_reviews_text.split('|')[1].strip().split(' ')[0].replace(',', ''))
             except (IndexError, ValueError):
                 print("Could not parse total reviews count. Generating mock reviews instead.")
-                return self._generate_mock_reviews(max_reviews)
+                yield from self._mock_pages(max_reviews)
+                return
             
             print(f"Total reviews: {total_reviews}")
             
@@ -266,125 +329,80 @@ class AmazonReviewCrawler(ReviewCrawler):
             
             print(f"Will crawl {pages_to_crawl} pages of reviews")
             
-            all_reviews = []
-            
             # Extract reviews from the first page
-            reviews = self._extract_reviews_from_page(soup)
-            all_reviews.extend(reviews)
+            reviews = first_page.reviews
+            if reviews:
+                crawled += len(reviews)
+                yield reviews
             
-            # Crawl additional pages
-            for page in tqdm(range(2, pages_to_crawl + 1), desc="Crawling review pages"):
-                # Add delay to avoid being blocked
-                time.sleep(random.uniform(1.0, 3.0))
-                
-                # Update headers with a new random user agent
-                headers['User-Agent'] = self._get_random_user_agent()
-                
-                # Construct URL for the next page
-                next_page_url = f"{reviews_url}&pageNumber={page}"
-                
-                try:
-                    response = requests.get(next_page_url, headers=headers, timeout=10)
-                    
-                    # Check if we've been blocked
-                    if response.status_code != 200 or 'captcha' in response.text.lower():
-                        print(f"Blocked after page {page-1}. Using reviews collected so far.")
-                        break
+            # Crawl additional pages concurrently, handling them in order so
+            # we stop at the first blocked page. Leaving the loop (including
+            # when the consumer stops reading pages early) cancels the rest.
+            page_urls = [f"{reviews_url}&pageNumber={page}" for page in range(2, pages_to_crawl + 1)]
+            
+            with closing(self._fetch_concurrently(page_urls, headers)) as futures:
+                for page, future in tqdm(enumerate(futures, start=2), total=len(page_urls), desc="Crawling review pages"):
+                    try:
+                        response = future.result()
                         
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    page_reviews = self._extract_reviews_from_page(soup)
-                    
-                    if not page_reviews:
-                        print(f"No reviews found on page {page}. Moving on.")
-                        continue
+                        # Check if we've been blocked
+                        if response.status_code != 200 or 'captcha' in response.text.lower():
+                            print(f"Blocked after page {page-1}. Using reviews collected so far.")
+                            break
+                            
+                        with metrics.timer("parse"):
+                            page_reviews = parse_review_page(response.text).reviews
                         
-                    all_reviews.extend(page_reviews)
-                    
-                    # Check if we have enough reviews
-                    if len(all_reviews) >= max_reviews:
-                        break
+                        if not page_reviews:
+                            print(f"No reviews found on page {page}. Moving on.")
+                            continue
+                            
+                        crawled += len(page_reviews)
+                        yield page_reviews
                         
-                except Exception as e:
-                    print(f"Error crawling page {page}: {str(e)}")
-                    break
+                        # Check if we have enough reviews
+                        if crawled >= max_reviews:
+                            break
+                            
+                    except Exception as e:
+                        print(f"Error crawling page {page}: {str(e)}")
+                        break
             
-            print(f"Successfully crawled {len(all_reviews)} reviews")
+            print(f"Successfully crawled {crawled} reviews")
+            self._report_crawl_stats()
             
             # If we didn't get any reviews, generate mock data
-            if not all_reviews:
+            if not crawled:
                 print("No reviews were successfully crawled. Generating mock reviews instead.")
-                return self._generate_mock_reviews(max_reviews)
-                
-            return all_reviews
+                yield from self._mock_pages(max_reviews)
             
         except Exception as e:
+            if crawled:
+                # Keep the pages that were already handed out
+                print(f"Error crawling reviews: {str(e)}. Using reviews collected so far.")
+                return
             print(f"Error crawling reviews: {str(e)}. Generating mock reviews instead.")
-            return self._generate_mock_reviews(max_reviews)
-    
-    def _extract_reviews_from_page(self, soup):
-        """Extract reviews from a BeautifulSoup object of an Amazon review page"""
-        reviews = []
-        
-        # Find all review divs
-        review_divs = soup.find_all('div', {'data-hook': 'review'})
-        
-        for div in review_divs:
-            try:
-                # Extract rating
-                rating_span = div.find('i', {'data-hook': 'review-star-rating'})
-                if not rating_span:
-                    rating_span = div.find('i', {'class': 'a-icon-star'})
-                
-                if rating_span:
-                    rating_text = rating_span.text.strip()
-                    rating = float(rating_text.split(' ')[0])
-                else:
-                    # Skip reviews without ratings
-                    continue
-                
-                # Extract title
-                title_element = div.find('a', {'data-hook': 'review-title'})
-                if not title_element:
-                    title_element = div.find('span', {'data-hook': 'review-title'})
-                
-                title = title_element.text.strip() if title_element else ""
-                
-                # Extract date
-                date_element = div.find('span', {'data-hook': 'review-date'})
-                date = date_element.text.strip() if date_element else ""
-                
-                # Extract text
-                text_element = div.find('span', {'data-hook': 'review-body'})
-                text = text_element.text.strip() if text_element else ""
-                
-                # Check if verified purchase
-                verified_element = div.find('span', {'data-hook': 'avp-badge'})
-                verified = verified_element is not None
-                
-                reviews.append({
-                    'rating': rating,
-                    'title': title,
-                    'date': date,
-                    'text': text,
-                    'verified': verified
-                })
-                
-            except Exception as e:
-                print(f"Error extracting review: {str(e)}")
-                continue
-        
-        return reviews
+            yield from self._mock_pages(max_reviews)
 
 class WalmartReviewCrawler(ReviewCrawler):
     """Crawler for Walmart product reviews"""
     
-    def crawl_reviews(self, product_url, max_reviews=500):
-        """Crawl reviews from Walmart product page"""
+    default_base_url = "https://www.walmart.com"
+    
+    # Reviews requested per API call
+    page_size = 50
+    
+    def iter_review_pages(self, product_url, max_reviews=500):
+        """Crawl reviews from Walmart product page, yielding pages of reviews"""
+        from tqdm import tqdm
+        
         if 'walmart' not in product_url.lower():
             print("Not a Walmart URL. Generating mock reviews instead.")
-            return self._generate_mock_reviews(max_reviews)
+            yield from self._mock_pages(max_reviews)
+            return
             
         print(f"Crawling Walmart reviews for: {product_url}")
+        self._start_crawl()
         
         # Extract product ID from URL
         if '/ip/' in product_url:
@@ -400,88 +418,154 @@ class WalmartReviewCrawler(ReviewCrawler):
                                 break
             except:
                 print("Could not extract product ID from URL. Generating mock reviews instead.")
-                return self._generate_mock_reviews(max_reviews)
+                yield from self._mock_pages(max_reviews)
+                return
         else:
             print("Could not extract product ID from URL. Generating mock reviews instead.")
-            return self._generate_mock_reviews(max_reviews)
+            yield from self._mock_pages(max_reviews)
+            return
         
-        # Walmart uses an API for reviews, we'll try to access it
-        api_url = f"https://www.walmart.com/reviews/api/product/{product_id}?limit={max_reviews}&page=1&sort=submission-desc&filters=&showProduct=false"
+        # Walmart's reviews API is paginated; ask for pages of a bounded size
+        # rather than everything at once
+        page_size = min(self.page_size, max_reviews)
+        api_url = f"{self.base_url}/reviews/api/product/{product_id}?limit={page_size}&sort=submission-desc&filters=&showProduct=false"
         
         headers = {
-            'User-Agent': self._get_random_user_agent(),
             'Accept': 'application/json',
             'Accept-Language': 'en-US,en;q=0.9',
             'Referer': product_url,
             'Connection': 'keep-alive',
         }
         
+        crawled = 0
+        
         try:
-            response = requests.get(api_url, headers=headers, timeout=10)
+            response = self._fetch(f"{api_url}&page=1", headers)
             
             # Check if we've been blocked or got an error
             if response.status_code != 200:
                 print(f"Failed to access Walmart reviews API (status code: {response.status_code}). Generating mock reviews instead.")
-                return self._generate_mock_reviews(max_reviews)
+                yield from self._mock_pages(max_reviews)
+                return
                 
             # Parse JSON response
             try:
-                review_data = response.json()
+                with metrics.timer("parse"):
+                    review_data = response.json()
             except:
                 print("Failed to parse Walmart reviews JSON. Generating mock reviews instead.")
-                return self._generate_mock_reviews(max_reviews)
+                yield from self._mock_pages(max_reviews)
+                return
             
-            # Extract reviews from the response
-            reviews = []
+            if not review_data.get('reviews'):
+                print("No reviews found for this product. Generating mock reviews instead.")
+                yield from self._mock_pages(max_reviews)
+                return
             
-            try:
-                review_list = review_data.get('reviews', [])
-                
-                if not review_list:
-                    print("No reviews found for this product. Generating mock reviews instead.")
-                    return self._generate_mock_reviews(max_reviews)
-                
-                for review in review_list:
+            # The first page says how many reviews there are; without that,
+            # fetch enough pages for max_reviews and stop at the first empty one.
+            # The API may serve fewer reviews per page than asked for, so count
+            # pages in what it actually serves
+            pagination = review_data.get('pagination') or {}
+            total_reviews = pagination.get('total')
+            served_page_size = pagination.get('pageSize') or len(review_data['reviews'])
+            wanted = min(max_reviews, total_reviews) if total_reviews else max_reviews
+            pages_to_crawl = math.ceil(wanted / served_page_size)
+            print(f"Will crawl {pages_to_crawl} pages of reviews")
+            
+            reviews = self._parse_reviews(review_data)[:max_reviews]
+            if reviews:
+                crawled += len(reviews)
+                yield reviews
+            
+            # Fetch the other pages concurrently, handing each one out as soon
+            # as it (and every page before it) has arrived
+            page_urls = [f"{api_url}&page={page}" for page in range(2, pages_to_crawl + 1)]
+            
+            with closing(self._fetch_concurrently(page_urls, headers)) as futures:
+                for page, future in tqdm(enumerate(futures, start=2), total=len(page_urls), desc="Crawling review pages"):
                     try:
-                        rating = review.get('rating', 0)
-                        title = review.get('title', '')
-                        text = review.get('reviewText', '')
-                        date = review.get('submissionDate', '')
+                        response = future.result()
+                        
+                        if response.status_code != 200:
+                            print(f"Failed to fetch page {page} (status code: {response.status_code}). Using reviews collected so far.")
+                            break
+                        
+                        with metrics.timer("parse"):
+                            page_reviews = self._parse_reviews(response.json())
+                        
+                        if not page_reviews:
+                            # Past the last page
+                            break
                         
-                        # Format date if it's a timestamp
-                        if isinstance(date, int) or date.isdigit():
-                            date_obj = datetime.datetime.fromtimestamp(int(date) / 1000)
-                            date = date_obj.strftime('%B %d, %Y')
+                        page_reviews = page_reviews[:max_reviews - crawled]
+                        crawled += len(page_reviews)
+                        yield page_reviews
                         
-                        verified = review.get('verifiedPurchase', False)
+                        # Stop as soon as we have enough reviews
+                        if crawled >= max_reviews:
+                            break
                         
-                        reviews.append({
-                            'rating': rating,
-                            'title': title,
-                            'text': text,
-                            'date': date,
-                            'verified': verified
-                        })
                     except Exception as e:
-                        print(f"Error parsing review: {str(e)}")
-                        continue
+                        print(f"Error crawling page {page}: {str(e)}")
+                        break
+            
+            print(f"Successfully crawled {crawled} reviews from Walmart")
+            self._report_crawl_stats()
+            
+            # If we didn't get any reviews, generate mock data
+            if not crawled:
+                print("No reviews were successfully crawled. Generating mock reviews instead.")
+                yield from self._mock_pages(max_reviews)
+            
+        except Exception as e:
+            if crawled:
+                # Keep the pages that were already handed out
+                print(f"Error crawling Walmart reviews: {str(e)}. Using reviews collected so far.")
+                return
+            print(f"Error crawling Walmart reviews: {str(e)}. Generating mock reviews instead.")
+            yield from self._mock_pages(max_reviews)
+    
+    def _parse_reviews(self, review_data):
+        """Convert the reviews of one API response to our review format"""
+        reviews = []
+        for review in review_data.get('reviews', []):
+            try:
+                rating = review.get('rating', 0)
+                title = review.get('title', '')
+                text = review.get('reviewText', '')
+                date = review.get('submissionDate', '')
                 
-                print(f"Successfully crawled {len(reviews)} reviews from Walmart")
+                # Format date if it's a timestamp
+                if isinstance(date, int) or date.isdigit():
+                    date_obj = datetime.datetime.fromtimestamp(int(date) / 1000)
+                    date = date_obj.strftime('%B %d, %Y')
                 
-                # If we didn't get any reviews, generate mock data
-                if not reviews:
-                    print("No reviews were successfully crawled. Generating mock reviews instead.")
-                    return self._generate_mock_reviews(max_reviews)
-                    
-                return reviews
+                verified = review.get('verifiedPurchase', False)
                 
+                # Without a review id, identify the review by who wrote what and when
+                review_id = review.get('reviewId')
+                if not review_id:
+                    review_id = 'h' + hashlib.sha1(json.dumps([
+                        review.get('userNickname'), review.get('submissionDate'), rating, title, text
+                    ]).encode('utf-8')).hexdigest()
+                
+                reviews.append({
+                    'id': str(review_id),
+                    'rating': rating,
+                    'title': title,
+                    'text': text,
+                    'date': date,
+                    'verified': verified
+                })
             except Exception as e:
-                print(f"Error extracting reviews from response: {str(e)}. Generating mock reviews instead.")
-                return self._generate_mock_reviews(max_reviews)
-            
-        except Exception as e:
-            print(f"Error crawling Walmart reviews: {str(e)}. Generating mock reviews instead.")
-            return self._generate_mock_reviews(max_reviews)
+                print(f"Error parsing review: {str(e)}")
+                continue
+        return reviews
+
+def product_id_from_url(url):
+    """Extract the product id (Amazon ASIN or Walmart item id) from a product URL"""
+    return url.split('/dp/')[-1].split('/')[0] if '/dp/' in url else url.split('/')[-1].split('?')[0]
 
 def get_crawler_for_url(url):
     """Factory function to get the appropriate crawler based on the URL"""
@@ -0,0 +1,153 @@
+import json
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class CachedResponse:
+    """A response read from the cache, with the validators needed to revalidate it"""
+
+    def __init__(self, url, status_code, headers, body, encoding, stored_at):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.encoding = encoding
+        self.stored_at = stored_at
+
+    def age(self):
+        return time.time() - self.stored_at
+
+    def conditional_headers(self):
+        """Headers asking the server to answer 304 if the response hasn't changed"""
+        headers = {}
+        if 'ETag' in self.headers:
+            headers['If-None-Match'] = self.headers['ETag']
+        if 'Last-Modified' in self.headers:
+            headers['If-Modified-Since'] = self.headers['Last-Modified']
+        return headers
+
+    def to_response(self):
+        """Rebuild a requests.Response so callers can't tell it came from the cache"""
+        response = requests.Response()
+        response.url = self.url
+        response.status_code = self.status_code
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = self.encoding
+        response._content = self.body
+        return response
+
+
+class CacheStats:
+    """Hit/revalidation/miss counts of one crawl"""
+
+    def __init__(self):
+        self.hits = 0
+        # Stale entries the server confirmed unchanged (304)
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def to_dict(self):
+        with self._lock:
+            requests_made = self.hits + self.revalidated + self.misses
+            return {
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                # Responses that didn't need a full download
+                "hit_ratio": (self.hits + self.revalidated) / requests_made if requests_made else 0.0,
+            }
+
+
+class HttpCache:
+    """
+    SQLite cache of crawled responses, keyed by URL. Entries younger than
+    `ttl` seconds are served without a request; older ones are revalidated
+    with their ETag/Last-Modified when the server sent one, or fetched
+    again. The least recently used entries are dropped once the bodies
+    take more than `max_bytes`.
+    """
+
+    def __init__(self, path, ttl=6 * 3600, max_bytes=500 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Several processes (job workers, the CLI) may share the file
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, status INTEGER NOT NULL, headers TEXT NOT NULL, body BLOB NOT NULL, "
+            "encoding TEXT, stored_at REAL NOT NULL, used_at REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+        self._db.commit()
+
+    def get(self, url):
+        """Return the CachedResponse stored for the URL, fresh or not, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, body, encoding, stored_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET used_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+
+        status, headers, body, encoding, stored_at = row
+        return CachedResponse(url, status, json.loads(headers), body, encoding, stored_at)
+
+    def is_fresh(self, cached):
+        return cached.age() < self.ttl
+
+    def put(self, url, response):
+        """Store a response, unless the server asked for it not to be"""
+        if 'no-store' in response.headers.get('Cache-Control', ''):
+            return
+
+        body = response.content
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (url, status, headers, body, encoding, stored_at, used_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, response.status_code, json.dumps(dict(response.headers)), body, response.encoding,
+                 now, now, len(body))
+            )
+            self._evict()
+            self._db.commit()
+
+    def refresh(self, url):
+        """Restart the TTL of an entry the server has confirmed is unchanged"""
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE responses SET stored_at = ?, used_at = ? WHERE url = ?", (now, now, url))
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Walk from least recently used until enough bytes are freed
+        excess = total - self.max_bytes
+        expired = []
+        for url, size in self._db.execute("SELECT url, size FROM responses ORDER BY used_at"):
+            expired.append((url,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._db.executemany("DELETE FROM responses WHERE url = ?", expired)
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": total, "max_bytes": self.max_bytes, "ttl": self.ttl}
@@ -0,0 +1,148 @@
+import os
+import random
+import re
+import struct
+import threading
+import time
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows: each process keeps its own buckets
+    fcntl = None
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import HttpCache
+
+
+class TokenBucket:
+    """Token bucket allowing `rate` requests per second with bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class FileTokenBucket:
+    """
+    TokenBucket whose state (tokens left, when they were counted) lives in a
+    small file, locked while it is updated, so every process using the file
+    draws from the same budget
+    """
+
+    STATE = struct.Struct("<dd")
+
+    def __init__(self, path, rate, capacity=1):
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with open(self.path, "a+b") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                data = f.read(self.STATE.size)
+                # Wall clock rather than monotonic, which isn't comparable across processes
+                now = time.time()
+                tokens, updated = self.STATE.unpack(data) if len(data) == self.STATE.size else (self.capacity, now)
+                tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+
+                if tokens >= 1:
+                    wait = 0
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+
+                f.truncate(0)
+                f.write(self.STATE.pack(tokens, now))
+                # Closing the file releases the lock
+
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """
+    Keeps one token bucket per host so every crawl of a site shares the same
+    budget. With a state_dir the buckets are files there, shared by every
+    process (web server and job workers) that uses the directory.
+    """
+
+    def __init__(self, rate=1.0, burst=2, jitter=0.5, state_dir=None):
+        self.rate = rate
+        self.burst = burst
+        # Random extra delay (seconds) so requests don't go out on a fixed beat
+        self.jitter = jitter
+        self.state_dir = state_dir if fcntl is not None else None
+        if self.state_dir:
+            os.makedirs(self.state_dir, exist_ok=True)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _create_bucket(self, host):
+        if self.state_dir:
+            path = os.path.join(self.state_dir, re.sub(r"[^A-Za-z0-9.-]", "_", host) + ".bucket")
+            return FileTokenBucket(path, self.rate, self.burst)
+        return TokenBucket(self.rate, self.burst)
+
+    def wait(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = self._create_bucket(host)
+
+        bucket.acquire()
+        if self.jitter:
+            time.sleep(random.uniform(0, self.jitter))
+
+
+def create_session(pool_size=10):
+    """Create a requests session that keeps up to pool_size connections per host alive"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# Shared by all crawlers in the process
+max_workers = int(os.environ.get('CRAWL_MAX_WORKERS', '4'))
+session = create_session(pool_size=max_workers)
+# Shared with the other processes (job workers) through files in CRAWL_RATE_DIR
+rate_limiter = HostRateLimiter(
+    rate=float(os.environ.get('CRAWL_RATE_LIMIT', '1.0')),
+    state_dir=os.environ.get('CRAWL_RATE_DIR', os.path.join(os.path.dirname(__file__), 'data', 'rate_limits'))
+)
+
+# Optional on-disk cache of crawled pages, so repeat crawls skip unchanged pages
+_cache_path = os.environ.get('HTTP_CACHE_PATH')
+response_cache = HttpCache(
+    _cache_path,
+    ttl=float(os.environ.get('HTTP_CACHE_TTL', str(6 * 3600))),
+    max_bytes=int(float(os.environ.get('HTTP_CACHE_MAX_MB', '500')) * 1024 * 1024),
+) if _cache_path else None
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+
+from aggregates import SentimentTotals
+
+
+def _hash(*parts):
+    return hashlib.sha1("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+def review_identities(reviews):
+    """Yield a hash per review telling which stored review a crawled one corresponds to"""
+    seen = {}
+    for review in reviews:
+        if review.get('id'):
+            yield _hash('id', review['id'])
+            continue
+
+        # Without a site review id, fall back to the review's own fields
+        identity = _hash(review.get('date', ''), review.get('title', ''), review.get('text', ''))
+
+        # Disambiguate identical reviews within the same crawl
+        occurrence = seen.get(identity, 0)
+        seen[identity] = occurrence + 1
+        yield _hash(identity, occurrence) if occurrence else identity
+
+
+def review_keys(reviews):
+    """
+    Yield (identity, content) hashes for each review. The identity tells
+    us which stored review a crawled one corresponds to, the content hash
+    tells us whether it was edited since.
+    """
+    for identity, review in zip(review_identities(reviews), reviews):
+        yield identity, _hash(review.get('title', ''), review.get('text', ''), review.get('rating', 0))
+
+
+class IncrementalAnalyzer:
+    """
+    Keeps the per-review results for each product on disk so that
+    re-analyzing a product only scores reviews that are new or changed.
+    """
+
+    # Shared by all instances to serialise read-modify-write cycles on the state files
+    _lock = threading.Lock()
+
+    def __init__(self, analyzer, data_dir, config=None):
+        self.analyzer = analyzer
+        self.data_dir = data_dir
+        if config is None:
+            from model_registry import registry
+            config = registry.analysis_config()
+        # Settings the stored scores depend on (the row cap only affects output)
+        self.config = {name: value for name, value in config.items() if name != "max_detail_rows"}
+
+    def _state_file(self, product_id):
+        return os.path.join(self.data_dir, f'{product_id}_analysis.json')
+
+    def _load_state(self, product_id):
+        path = self._state_file(product_id)
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state.get("config") == self.config:
+                return state
+            # Scored with another model, backend, threshold or summary mode; start over
+            print(f"Analysis settings changed since {product_id} was last analyzed; rescoring all reviews")
+
+        return {"config": self.config, "reviews": {}, "totals": SentimentTotals().to_dict()}
+
+    def _save_state(self, product_id, state):
+        os.makedirs(self.data_dir, exist_ok=True)
+        path = self._state_file(product_id)
+
+        # Write to a temporary file first so a crash never leaves a half-written state
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def analyze(self, product_id, reviews, batch_size=None):
+        """Merge freshly crawled reviews into the stored analysis of a product"""
+        if not reviews:
+            return {
+                "error": "No reviews to analyze"
+            }
+
+        with self._lock:
+            return self._analyze(product_id, reviews, batch_size)
+
+    def _analyze(self, product_id, reviews, batch_size):
+        state = self._load_state(product_id)
+        stored = state["reviews"]
+        totals = SentimentTotals.from_dict(state["totals"])
+        if totals is None:
+            # Saved by an older version without some of the aggregates; recount them from the stored reviews
+            totals = SentimentTotals()
+            for entry in stored.values():
+                totals.add(entry["scored"])
+
+        # Work out which reviews are new or have changed since the last crawl
+        pending = {}
+        unchanged = 0
+        for (identity, content), review in zip(review_keys(reviews), reviews):
+            entry = stored.get(identity)
+            if entry is not None and entry["content"] == content:
+                unchanged += 1
+            else:
+                pending[identity] = (content, review)
+
+        changed = sum(1 for identity in pending if identity in stored)
+
+        # Reviews the crawl no longer finds (deleted on the site) drop out of the aggregates
+        crawled = set(review_identities(reviews))
+        removed = [identity for identity in stored if identity not in crawled]
+        for identity in removed:
+            totals.remove(stored.pop(identity)["scored"])
+
+        print(f"Incremental analysis for {product_id}: {len(pending) - changed} new, "
+              f"{changed} changed, {unchanged} unchanged, {len(removed)} removed reviews")
+
+        # Only the delta goes through the model
+        scored_reviews = self.analyzer.score_reviews(
+            [review for _, review in pending.values()], batch_size=batch_size
+        )
+
+        for (identity, (content, _)), scored in zip(pending.items(), scored_reviews):
+            if identity in stored:
+                totals.remove(stored[identity]["scored"])
+            totals.add(scored)
+            stored[identity] = {"content": content, "scored": scored}
+
+        state["totals"] = totals.to_dict()
+        self._save_state(product_id, state)
+
+        rows = [entry["scored"]["row"] for entry in stored.values() if entry["scored"] is not None]
+        detailed_analysis = rows[:self.analyzer.max_detail_rows]
+        results = self.analyzer.build_results(totals, detailed_analysis, len(rows) - len(detailed_analysis))
+        results["incremental"] = {
+            "new": len(pending) - changed,
+            "changed": changed,
+            "unchanged": unchanged,
+            "removed": len(removed),
+        }
+        return results
@@ -0,0 +1,248 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+
+# Set in each worker process by _init_worker
+_progress_queue = None
+
+
+def _init_worker(progress_queue):
+    """Load the model once per worker process, before it takes its first job"""
+    global _progress_queue
+    _progress_queue = progress_queue
+
+    from model_registry import registry
+    registry.preload()
+
+
+def _report(job_id, **progress):
+    _progress_queue.put((job_id, progress))
+
+
+def _run_job(job_id, product_url, product_id, data_dir, incremental, max_reviews, known_fingerprint=None):
+    """Run a job inside a worker process, returning (results, metrics recorded in the worker)"""
+    with metrics.collect() as timings:
+        results = _crawl_and_analyze(
+            job_id, product_url, product_id, data_dir, incremental, max_reviews, known_fingerprint
+        )
+    results['timings'] = timings.to_dict()
+    return results, metrics.registry.drain()
+
+
+def _crawl_and_analyze(job_id, product_url, product_id, data_dir, incremental, max_reviews, known_fingerprint):
+    """
+    Crawl and analyze one product. If the crawl finds exactly the reviews
+    of a cached analysis (known_fingerprint), they aren't analyzed again and
+    the results only say so ('unchanged'); the manager fills in the cached analysis.
+    """
+    from analysis_cache import review_set_fingerprint
+    from crawler import get_crawler_for_url
+    from incremental import IncrementalAnalyzer
+    from model_registry import registry
+    from pipeline import run_pipeline
+    from review_store import ReviewStore
+
+    _report(job_id, status='running', stage='crawling', reviews_processed=0)
+
+    crawler = get_crawler_for_url(product_url)
+    analyzer = registry.get_analyzer()
+
+    if incremental or known_fingerprint is not None:
+        # Crawl everything before analyzing, to compare it with the cached analysis
+        reviews = crawler.crawl_reviews(product_url, max_reviews=max_reviews)
+        fingerprint = review_set_fingerprint(reviews)
+        _report(job_id, stage='analyzing', reviews_processed=0)
+        if not reviews:
+            results = None
+        elif fingerprint == known_fingerprint:
+            results = {'unchanged': True}
+        elif incremental:
+            results = IncrementalAnalyzer(analyzer, data_dir, registry.analysis_config()).analyze(product_id, reviews)
+        else:
+            results = analyzer.analyze_reviews(reviews)
+    else:
+        reviews, results = run_pipeline(
+            crawler, analyzer, product_url, max_reviews,
+            progress=lambda count: _report(job_id, stage='analyzing', reviews_processed=count)
+        )
+        fingerprint = review_set_fingerprint(reviews)
+
+    if not reviews:
+        raise ValueError('Could not retrieve reviews from the provided URL')
+    results['review_fingerprint'] = fingerprint
+
+    # Keep the crawled reviews for reference
+    ReviewStore(os.path.join(data_dir, 'reviews')).append(product_id, reviews)
+
+    if crawler.http_cache is not None:
+        results['http_cache'] = crawler.cache_stats.to_dict()
+    return results
+
+
+class JobManager:
+    """
+    Runs analysis jobs on a pool of worker processes, each holding its own
+    copy of the model. Requests for a product that already has a job queued
+    or running are attached to that job instead of starting another one.
+    Finished analyses go into the optional AnalysisCache, and a job whose
+    crawl matches a cached analysis reuses it.
+    """
+
+    def __init__(self, data_dir, max_workers=1, max_finished_jobs=200, analysis_cache=None):
+        self.data_dir = data_dir
+        self.max_workers = max_workers
+        self.max_finished_jobs = max_finished_jobs
+        self.analysis_cache = analysis_cache
+        self._jobs = OrderedDict()
+        self._inflight = {}
+        # Reentrant: a done callback can run immediately inside submit()
+        self._lock = threading.RLock()
+        self._executor = None
+        self._progress_queue = None
+
+    def _ensure_started(self):
+        # Started lazily so importing the app doesn't spawn processes
+        if self._executor is not None:
+            return
+
+        # Spawn rather than fork: forking a process that already runs torch
+        # thread pools can deadlock
+        context = multiprocessing.get_context('spawn')
+        if self._progress_queue is None:
+            self._progress_queue = context.Queue()
+            threading.Thread(target=self._listen_for_progress, daemon=True).start()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self._progress_queue,)
+        )
+
+    def _restart_executor(self):
+        """Replace a pool whose worker died; the progress queue and its listener are kept"""
+        print("Job worker pool is broken; starting a new one")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._ensure_started()
+
+    def _listen_for_progress(self):
+        while True:
+            job_id, progress = self._progress_queue.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                # Progress can arrive after the job has already finished
+                if job is None or job['finished_at'] is not None:
+                    continue
+                if 'status' in progress:
+                    job['status'] = progress.pop('status')
+                    job['started_at'] = time.time()
+                job['progress'].update(progress)
+
+    def submit(self, product_url, product_id, incremental=False, max_reviews=500, cache_key=None):
+        """
+        Queue a job for the product, returning (job, coalesced). The result
+        is cached under cache_key (see AnalysisCache.make_key) if given.
+        """
+        key = (product_id, incremental)
+        with self._lock:
+            self._ensure_started()
+
+            job_id = self._inflight.get(key)
+            if job_id is not None:
+                return self._public(self._jobs[job_id]), True
+
+            job_id = uuid.uuid4().hex
+            job = self._jobs[job_id] = {
+                'id': job_id,
+                'product_id': product_id,
+                'product_url': product_url,
+                'incremental': incremental,
+                'status': 'queued',
+                'progress': {},
+                'result': None,
+                'error': None,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+            }
+            self._evict_finished()
+
+            # A stale cached analysis is reused if the crawl finds the same reviews
+            cached = None
+            if self.analysis_cache is not None and cache_key is not None:
+                cached = self.analysis_cache.get(cache_key)
+
+            args = (
+                _run_job, job_id, product_url, product_id, self.data_dir, incremental, max_reviews,
+                cached.fingerprint if cached is not None else None
+            )
+            try:
+                try:
+                    future = self._executor.submit(*args)
+                except BrokenProcessPool:
+                    # A worker died (e.g. killed for using too much memory); retry once on a new pool
+                    self._restart_executor()
+                    future = self._executor.submit(*args)
+            except Exception as e:
+                job['finished_at'] = time.time()
+                job['error'] = str(e)
+                job['status'] = 'failed'
+                return self._public(job), False
+
+            # Only registered once the job is really queued, so a failed submit can't block the product
+            self._inflight[key] = job_id
+            future.add_done_callback(lambda future: self._finish(job_id, key, future, cache_key, cached))
+            return self._public(job), False
+
+    def _finish(self, job_id, key, future, cache_key=None, cached=None):
+        with self._lock:
+            self._inflight.pop(key, None)
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+
+            job['finished_at'] = time.time()
+            try:
+                results, worker_metrics = future.result()
+                if cache_key is not None and self.analysis_cache is not None:
+                    results = self._cache_results(cache_key, cached, results)
+                job['result'] = results
+                job['status'] = 'done'
+                metrics.registry.merge(worker_metrics)
+            except Exception as e:
+                job['error'] = str(e)
+                job['status'] = 'failed'
+
+    def _cache_results(self, cache_key, cached, results):
+        """Store a fresh analysis, or fill in the cached one the crawl matched"""
+        if results.pop('unchanged', False):
+            # This run's timings and crawl stats, over the cached analysis
+            results = dict(cached.results, **results, analysis_cache={'hit': True, 'age_seconds': cached.age()})
+            self.analysis_cache.refresh(cache_key, cached)
+            self.analysis_cache.record('reused')
+            return results
+
+        self.analysis_cache.put(cache_key, results, results['review_fingerprint'])
+        self.analysis_cache.record('misses')
+        return dict(results, analysis_cache={'hit': False})
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in ('done', 'failed')]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._public(job) if job is not None else None
+
+    @staticmethod
+    def _public(job):
+        return dict(job, progress=dict(job['progress']))
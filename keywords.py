@@ -0,0 +1,93 @@
+import bisect
+import re
+from itertools import accumulate
+
+# Words that mark a review as being about something other than the product
+DEFAULT_TAXONOMY = {
+    "shipping": ["shipping", "delivery", "arrived", "late", "delay"],
+    "packaging": ["package", "box", "damaged"],
+    "returns": ["return", "refund"],
+    "customer_service": ["customer service"],
+}
+
+# Inflections accepted after a keyword ("returned", "boxes", "delayed", ...)
+_SUFFIXES = r"(?:s|es|ed|ing)?"
+
+# Separates reviews when a batch is matched as one string; not a word
+# character and not whitespace, so no match can span two reviews
+_SEPARATOR = "\x00"
+
+
+class KeywordMatcher:
+    """
+    Finds taxonomy keywords in review text. Keywords only match whole words
+    (optionally inflected), so "box" matches "boxes" but not "xbox".
+
+    A batch of reviews is lowercased and joined once, then each keyword is
+    searched for across the whole batch. Every pattern starts with a literal,
+    which lets the regex engine use its fast substring search instead of
+    trying a match at every position.
+    """
+
+    def __init__(self, taxonomy=None):
+        self.taxonomy = {category: list(keywords) for category, keywords in (taxonomy or DEFAULT_TAXONOMY).items()}
+        self._compile()
+
+    def add_keywords(self, category, keywords):
+        """Extend (or create) a category with more keywords"""
+        self.taxonomy.setdefault(category, []).extend(keywords)
+        self._compile()
+
+    def _compile(self):
+        self._category_of = {}
+        for category, keywords in self.taxonomy.items():
+            for keyword in keywords:
+                self._category_of[self._normalize(keyword)] = category
+
+        # The word boundary before a keyword is checked by hand in
+        # match_batch; a leading \b would disable the fast literal search
+        self._patterns = [
+            (keyword, re.compile(re.escape(keyword).replace(r"\ ", r"\s+") + _SUFFIXES + r"\b"))
+            for keyword in self._category_of
+        ]
+        self._no_match = {"keywords": frozenset(), "categories": dict.fromkeys(self.taxonomy, 0)}
+
+    @staticmethod
+    def _normalize(keyword):
+        return " ".join(keyword.lower().split())
+
+    def _result(self, keywords):
+        if not keywords:
+            # Most reviews match nothing; they all share one (read-only) result
+            return self._no_match
+        categories = dict.fromkeys(self.taxonomy, 0)
+        for keyword in keywords:
+            categories[self._category_of[keyword]] += 1
+        return {"keywords": keywords, "categories": categories}
+
+    def match(self, text):
+        """Return the distinct keywords found in text and a count per category"""
+        return self.match_batch([text])[0]
+
+    def match_batch(self, texts):
+        """Match a batch of texts, searching their joined text once per keyword"""
+        lowered = [text.lower() for text in texts]
+        joined = _SEPARATOR.join(lowered)
+        if joined.count(_SEPARATOR) != max(len(texts) - 1, 0):
+            # Some review contains the separator itself
+            lowered = [text.replace(_SEPARATOR, " ") for text in lowered]
+            joined = _SEPARATOR.join(lowered)
+
+        # Start offset of every text in the joined string
+        starts = list(accumulate((len(text) + len(_SEPARATOR) for text in lowered), initial=0))
+
+        found = {}
+        for keyword, pattern in self._patterns:
+            for match in pattern.finditer(joined):
+                start = match.start()
+                if start and (joined[start - 1].isalnum() or joined[start - 1] == "_"):
+                    continue
+                index = bisect.bisect_right(starts, start) - 1
+                found.setdefault(index, set()).add(keyword)
+
+        return [self._result(found.get(index)) for index in range(len(texts))]
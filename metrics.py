@@ -0,0 +1,159 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Instrumentation can be switched off entirely; timer() is then a shared no-op
+enabled = os.environ.get("METRICS_ENABLED", "1") != "0"
+
+_NULL_TIMER = nullcontext()
+
+# Timings of the analysis currently running in this context (see collect())
+_current_timings = contextvars.ContextVar("current_timings", default=None)
+
+
+class MetricsRegistry:
+    """Process-wide stage duration histograms and event counters"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # stage -> [per-bucket counts (last one is +Inf), sum, count]
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "stages": {stage: [list(counts), total, count] for stage, (counts, total, count) in self._stages.items()},
+                "counters": dict(self._counters),
+            }
+
+    def drain(self):
+        """Return everything recorded so far and start again from zero (used by worker processes)"""
+        with self._lock:
+            snapshot = {"stages": self._stages, "counters": self._counters}
+            self._stages = {}
+            self._counters = {}
+        return snapshot
+
+    def merge(self, snapshot):
+        """Add a snapshot taken in another process"""
+        with self._lock:
+            for stage, (counts, total, count) in snapshot["stages"].items():
+                histogram = self._stages.setdefault(stage, [[0] * (len(self.buckets) + 1), 0.0, 0])
+                histogram[0] = [mine + theirs for mine, theirs in zip(histogram[0], counts)]
+                histogram[1] += total
+                histogram[2] += count
+            for name, value in snapshot["counters"].items():
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    def render(self):
+        """Render the metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP sentiment_stage_seconds Time spent in each stage of crawling and analysis",
+            "# TYPE sentiment_stage_seconds histogram",
+        ]
+        for stage, (counts, total, count) in sorted(snapshot["stages"].items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'sentiment_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'sentiment_stage_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'sentiment_stage_seconds_count{{stage="{stage}"}} {count}')
+
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE sentiment_{name} counter")
+            lines.append(f"sentiment_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class Timings:
+    """Stage durations of one analysis, returned as the `timings` section of its result"""
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, count=1):
+        with self._lock:
+            entry = self._stages.setdefault(stage, [0, 0.0])
+            entry[0] += count
+            entry[1] += seconds
+
+    def merge(self, timings):
+        """Add the to_dict() of timings recorded elsewhere (e.g. in a worker process)"""
+        for stage, entry in timings.items():
+            self.add(stage, entry["seconds"], entry["count"])
+
+    def to_dict(self):
+        with self._lock:
+            return {stage: {"count": count, "seconds": seconds} for stage, (count, seconds) in self._stages.items()}
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        registry.observe(self.stage, seconds)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.add(self.stage, seconds)
+
+
+def timer(stage):
+    """Context manager timing one occurrence of a stage"""
+    return _Timer(stage) if enabled else _NULL_TIMER
+
+
+def increment(name, value=1):
+    if enabled:
+        registry.increment(name, value)
+
+
+def current_timings():
+    return _current_timings.get()
+
+
+@contextmanager
+def collect():
+    """Collect the stage timings of everything run inside the block (and threads started with its context)"""
+    timings = Timings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+# Shared by everything in the process
+registry = MetricsRegistry()
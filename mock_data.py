@@ -0,0 +1,316 @@
+"""
+Seeded mock reviews in bulk, for load-testing the analyzer.
+
+Generates reviews with the same schema and distribution as the crawler's
+mock fallback (ReviewCrawler._generate_mock_reviews), but draws every random
+choice for a whole chunk at once with NumPy. Every review text, title and
+date comes from a small table of possible values, so reviews are built by
+indexing those tables instead of formatting strings one review at a time.
+
+    python mock_data.py --count 5000000 --seed 0 --output data/soak_reviews.json
+    python cli.py data/soak_reviews.json -o soak.ndjson
+"""
+import argparse
+import datetime
+import json
+import sys
+import time
+
+import numpy as np
+
+# Kinds of review and how often each is generated
+REVIEW_TYPES = ("positive", "negative", "neutral", "non_product")
+TYPE_WEIGHTS = (0.5, 0.3, 0.1, 0.1)
+
+# Phrases mock reviews are made of
+PHRASES = {
+    "positive": [
+        "This product exceeded my expectations. The quality is outstanding.",
+        "I'm extremely satisfied with this purchase. It works perfectly.",
+        "Best purchase I've made in a long time. Highly recommend!",
+        "This is exactly what I was looking for. Great value for money.",
+        "Excellent product that delivers on all its promises.",
+        "I'm impressed with how well this works. Will buy again.",
+        "The quality is much better than I expected for the price.",
+        "This product has made my life so much easier. Love it!",
+        "Fantastic product with great attention to detail.",
+        "I've recommended this to all my friends. It's that good!",
+        "Surprisingly good quality for the price point.",
+        "This product is durable and well-designed. Very happy with it.",
+        "The customer service was excellent when I had questions.",
+        "This exceeded my expectations in every way possible.",
+        "I use this product daily and it has held up wonderfully."
+    ],
+    "negative": [
+        "Unfortunately, this product didn't meet my expectations.",
+        "I'm disappointed with the quality. It feels cheaply made.",
+        "This broke after just a few uses. Would not recommend.",
+        "Save your money and look elsewhere. Not worth it.",
+        "The description was misleading. Not what I expected at all.",
+        "Poor quality control. Mine arrived with defects.",
+        "This is overpriced for what you get. Not good value.",
+        "I had high hopes but was let down by this product.",
+        "Had to return this. It simply didn't work as advertised.",
+        "The design has some serious flaws that make it frustrating to use.",
+        "I regret this purchase and wouldn't buy it again.",
+        "The product is much smaller/larger than it appears in photos.",
+        "It worked for a week then completely stopped functioning.",
+        "The materials feel cheap and I worry about longevity.",
+        "This is the worst version of this product I've ever used."
+    ],
+    "neutral": [
+        "This product is okay. Nothing special but it works.",
+        "It does the job, but I've seen better options out there.",
+        "Average quality for the price. No complaints but not amazing.",
+        "It's a decent product with some room for improvement.",
+        "Some features are good, others could be better.",
+        "It's exactly what you'd expect for this price point.",
+        "The product works as described, but the design could be improved.",
+        "It's functional but lacks some of the premium features of competitors.",
+        "I have mixed feelings about this purchase.",
+        "It's fine for occasional use but I wouldn't rely on it daily.",
+        "Not bad, not great - just average in most respects.",
+        "It serves its purpose but doesn't exceed expectations.",
+        "The quality is acceptable but not impressive.",
+        "It's a basic version that works but lacks extras.",
+        "I'm neither disappointed nor impressed with this product."
+    ],
+    "non_product": [
+        "The shipping was extremely slow. Took weeks to arrive.",
+        "Package arrived damaged but the seller quickly sent a replacement.",
+        "The customer service was terrible when I had an issue.",
+        "Delivery was faster than expected. Great service!",
+        "The box was damaged but luckily the product inside was fine.",
+        "Had issues with delivery but the company resolved it quickly.",
+        "The packaging was excessive and not environmentally friendly.",
+        "The product was left in the rain by the delivery person.",
+        "Great communication from the seller throughout the process.",
+        "The return process was simple and hassle-free.",
+        "Shipping took longer than the estimated delivery date.",
+        "The package was well protected and arrived in perfect condition.",
+        "Had to contact customer service twice before my issue was resolved.",
+        "The delivery person was very helpful and professional.",
+        "The tracking information was inaccurate throughout shipping."
+    ],
+}
+
+# Titles used instead of the review's first words, by rating (4-5, 1-2, 3)
+GENERIC_TITLES = {
+    "positive": ["Great product!", "Very satisfied", "Highly recommend", "Excellent purchase", "Love it!"],
+    "negative": ["Disappointed", "Not worth it", "Save your money", "Wouldn't recommend", "Regrettable purchase"],
+    "neutral": ["It's okay", "Decent product", "Average", "Not bad", "Does the job"],
+}
+
+# Words of the review text used as its title
+TITLE_WORDS = (3, 4, 5, 6)
+
+DATE_FORMAT = "%B %d, %Y"
+
+# Fixed day seeded dates count back from, so they don't drift between runs
+SEEDED_TODAY = datetime.datetime(2024, 1, 1)
+
+
+def rating_bucket(rating):
+    """Which phrase/title list matches a star rating"""
+    return "positive" if rating >= 4 else "negative" if rating <= 2 else "neutral"
+
+
+class _Tables:
+    """Every possible review text, title and date, and where each group starts"""
+
+    def __init__(self, today):
+        self.sizes = np.array([len(PHRASES[kind]) for kind in REVIEW_TYPES])
+        texts = []
+
+        # One phrase
+        self.single = {}
+        for kind in REVIEW_TYPES:
+            self.single[kind] = len(texts)
+            texts.extend(PHRASES[kind])
+
+        # Two phrases of the same product-related kind
+        self.double = {}
+        for kind in REVIEW_TYPES[:3]:
+            self.double[kind] = len(texts)
+            texts.extend(f"{first} {second}" for first in PHRASES[kind] for second in PHRASES[kind])
+
+        # A non-product phrase followed by a comment on the product
+        self.comment = {}
+        for bucket in GENERIC_TITLES:
+            self.comment[bucket] = len(texts)
+            texts.extend(
+                f"{base} As for the product itself: {product}"
+                for base in PHRASES["non_product"] for product in PHRASES[bucket]
+            )
+
+        # The first few words of each text, then the generic titles
+        titles = []
+        for text in texts:
+            words = text.split()
+            for length in TITLE_WORDS:
+                count = min(length, len(words))
+                titles.append(" ".join(words[:count]) + ("..." if len(words) > count else ""))
+        self.generic = {}
+        for bucket, generic in GENERIC_TITLES.items():
+            self.generic[bucket] = len(titles)
+            titles.extend(generic)
+
+        self.texts = np.array(texts, dtype=object)
+        self.titles = np.array(titles, dtype=object)
+        # Index = days ago
+        self.dates = np.array(
+            [(today - datetime.timedelta(days=days)).strftime(DATE_FORMAT) for days in range(366)], dtype=object
+        )
+
+
+class MockReviewGenerator:
+    """
+    Generates mock reviews chunk by chunk from one NumPy random generator,
+    so the same seed (and chunk size) always gives the same reviews.
+    """
+
+    def __init__(self, seed=None, today=None):
+        self.rng = np.random.default_rng(seed)
+        self.today = today or (SEEDED_TODAY if seed is not None else datetime.datetime.now())
+        self.tables = _Tables(self.today)
+        self._encoded = None
+
+    def _draw(self, count):
+        """Draw `count` reviews as arrays of rating, title index, text index, days ago and verified flag"""
+        rng = self.rng
+        tables = self.tables
+
+        kinds = rng.choice(len(REVIEW_TYPES), size=count, p=TYPE_WEIGHTS)
+        non_product = kinds == REVIEW_TYPES.index("non_product")
+
+        # Ratings: mostly 5 / 1 / 3 for positive / negative / neutral, anything for the rest
+        draw = rng.random(count)
+        rating = np.select(
+            [kinds == 0, kinds == 1, kinds == 2],
+            [np.where(draw < 0.3, 4, 5), np.where(draw < 0.7, 1, 2), np.where(draw < 0.8, 3, 4)],
+            rng.integers(1, 6, size=count),
+        )
+        buckets = np.where(rating >= 4, 0, np.where(rating <= 2, 1, 2))
+
+        # Phrase picks as uniform draws, scaled to the length of the list they pick from
+        first, second = rng.random(count), rng.random(count)
+
+        # 30% of product reviews get a second phrase, 20% of the others a product comment
+        extra = rng.random(count)
+        doubled = ~non_product & (extra < 0.3)
+        commented = non_product & (extra < 0.2)
+
+        text = np.empty(count, dtype=np.int64)
+        for index, kind in enumerate(REVIEW_TYPES):
+            size = tables.sizes[index]
+            mask = kinds == index
+            text[mask] = tables.single[kind] + (first[mask] * size).astype(np.int64)
+            if kind != "non_product":
+                mask &= doubled
+                text[mask] = (tables.double[kind] + (first[mask] * size).astype(np.int64) * size
+                              + (second[mask] * size).astype(np.int64))
+
+        for index, bucket in enumerate(GENERIC_TITLES):
+            mask = commented & (buckets == index)
+            size = len(PHRASES[bucket])
+            text[mask] = (tables.comment[bucket] + (first[mask] * tables.sizes[-1]).astype(np.int64) * size
+                          + (second[mask] * size).astype(np.int64))
+
+        # 70% of titles are the text's first 3-6 words, the rest a generic title for the rating
+        title = text * len(TITLE_WORDS) + rng.integers(0, len(TITLE_WORDS), size=count)
+        generic = rng.random(count) >= 0.7
+        pick = rng.random(count)
+        for index, bucket in enumerate(GENERIC_TITLES):
+            mask = generic & (buckets == index)
+            title[mask] = tables.generic[bucket] + (pick[mask] * len(GENERIC_TITLES[bucket])).astype(np.int64)
+
+        days = rng.integers(1, 366, size=count)
+        verified = rng.random(count) < 0.8
+        return rating, title, text, days, verified
+
+    def columns(self, count):
+        """Generate `count` reviews as a dict of column arrays (rating, title, text, date, verified)"""
+        rating, title, text, days, verified = self._draw(count)
+        return {
+            "rating": rating,
+            "title": self.tables.titles[title],
+            "text": self.tables.texts[text],
+            "date": self.tables.dates[days],
+            "verified": verified,
+        }
+
+    def reviews(self, count):
+        """Generate `count` reviews as dicts, like the crawler returns them"""
+        columns = self.columns(count)
+        return [
+            {"rating": rating, "title": title, "text": text, "date": date, "verified": verified}
+            for rating, title, text, date, verified in zip(
+                columns["rating"].tolist(), columns["title"].tolist(), columns["text"].tolist(),
+                columns["date"].tolist(), columns["verified"].tolist(),
+            )
+        ]
+
+    def json_lines(self, count):
+        """Generate `count` reviews already encoded as JSON objects, one string per review"""
+        if self._encoded is None:
+            # Encode each possible value once rather than once per review
+            encode = np.frompyfunc(json.dumps, 1, 1)
+            self._encoded = tuple(encode(table) for table in (self.tables.titles, self.tables.texts, self.tables.dates))
+        titles, texts, dates = self._encoded
+
+        rating, title, text, days, verified = self._draw(count)
+        return [
+            f'{{"rating": {rating}, "title": {title}, "text": {text}, "date": {date}, "verified": {verified}}}'
+            for rating, title, text, date, verified in zip(
+                rating.tolist(), titles[title].tolist(), texts[text].tolist(), dates[days].tolist(),
+                np.where(verified, "true", "false").tolist(),
+            )
+        ]
+
+
+def iter_review_chunks(count, seed=None, chunk_size=100000):
+    """Yield `count` mock reviews in lists of up to chunk_size"""
+    generator = MockReviewGenerator(seed)
+    for start in range(0, count, chunk_size):
+        yield generator.reviews(min(chunk_size, count - start))
+
+
+def generate_reviews(count, seed=None, chunk_size=100000):
+    """Generate `count` mock reviews as one list"""
+    reviews = []
+    for chunk in iter_review_chunks(count, seed, chunk_size):
+        reviews.extend(chunk)
+    return reviews
+
+
+def write_reviews(path, count, seed=None, chunk_size=100000):
+    """
+    Write `count` mock reviews to a JSON file (a list of reviews, as read by
+    cli.py) a chunk at a time, so memory use doesn't grow with count
+    """
+    generator = MockReviewGenerator(seed)
+    with open(path, "w") as f:
+        f.write("[")
+        for start in range(0, count, chunk_size):
+            lines = generator.json_lines(min(chunk_size, count - start))
+            f.write(",\n" if start else "\n")
+            f.write(",\n".join(lines))
+        f.write("\n]\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000000, help="reviews to generate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=100000, help="reviews generated and written at a time")
+    parser.add_argument("-o", "--output", required=True, help="JSON file to write")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    write_reviews(args.output, args.count, args.seed, args.chunk_size)
+    seconds = time.perf_counter() - start
+    print(f"Wrote {args.count} mock reviews to {args.output} in {seconds:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# Model settings that other modules need without importing the analyzer
+# (and with it torch and transformers)
+
+# Using DistilBERT which is smaller and faster than BERT but still effective
+MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+
+# Probability a review needs to be labelled Positive or Negative
+SENTIMENT_THRESHOLD = 0.7
@@ -0,0 +1,173 @@
+import importlib.util
+import os
+import threading
+import time
+
+import metrics
+from model_config import MODEL_NAME, SENTIMENT_THRESHOLD
+
+# The analyzer modules (torch, transformers, numpy) are imported when the
+# model is first loaded, so processes that only import the registry (the
+# web app answering health checks, job managers) start quickly
+
+# Optional packages (not in requirements.txt) each inference backend needs
+BACKEND_PACKAGES = {"onnx": "onnxruntime"}
+
+
+class ModelRegistry:
+    """Process-wide registry that loads the sentiment model once and shares it"""
+
+    def __init__(self, warmup=True, cache_size=10000, cache_path=None, backend="torch", inference_workers=1,
+                 summary_mode="lead", token_cache_dir=None, max_detail_rows=None):
+        package = BACKEND_PACKAGES.get(backend)
+        if package is not None and importlib.util.find_spec(package) is None:
+            # Fail at startup rather than when the model is first loaded
+            raise ImportError(f"SENTIMENT_BACKEND={backend} requires {package}: pip install {package}")
+
+        self.warmup = warmup
+        self.backend = backend
+        self.summary_mode = summary_mode
+        self.inference_workers = inference_workers
+        self.cache_size = cache_size
+        self.cache_path = cache_path
+        self.token_cache_dir = token_cache_dir
+        self.max_detail_rows = max_detail_rows
+        self._analyzer = None
+        self._lock = threading.Lock()
+        # Background preload thread, and the error it failed with (if any)
+        self._preload_thread = None
+        self.load_error = None
+        self.load_time = None
+        self.warmup_time = None
+        self.loaded_at = None
+        self.requests_served = 0
+
+    @property
+    def is_loaded(self):
+        return self._analyzer is not None
+
+    def get_analyzer(self):
+        """Return the shared analyzer, loading it on first use"""
+        analyzer = self._analyzer
+        if analyzer is None:
+            with self._lock:
+                # Another thread may have finished loading while we waited
+                if self._analyzer is None:
+                    self._load()
+                analyzer = self._analyzer
+
+        self.requests_served += 1
+        return analyzer
+
+    def preload(self):
+        """Load (and optionally warm up) the model before the first request"""
+        with self._lock:
+            if self._analyzer is None:
+                self._load()
+        return self._analyzer
+
+    def preload_in_background(self):
+        """Start loading the model in a daemon thread, so the server can answer requests meanwhile"""
+        def load():
+            try:
+                self.preload()
+            except Exception as e:
+                self.load_error = str(e)
+                print(f"Error preloading model: {self.load_error}")
+
+        with self._lock:
+            if self._analyzer is None and self._preload_thread is None:
+                self._preload_thread = threading.Thread(target=load, name="model-preload", daemon=True)
+                self._preload_thread.start()
+
+    @property
+    def state(self):
+        """cold (not loaded), loading, warm (loaded) or failed (background preload failed)"""
+        if self._analyzer is not None:
+            return "warm"
+        if self.load_error is not None:
+            return "failed"
+        if self._preload_thread is not None and self._preload_thread.is_alive():
+            return "loading"
+        return "cold"
+
+    def _load(self):
+        from analyzer import SentimentAnalyzer
+        from cache import SentimentCache
+        from parallel import ParallelSentimentAnalyzer
+        from token_cache import TokenCache
+
+        start = time.perf_counter()
+        cache = SentimentCache(max_entries=self.cache_size, path=self.cache_path) if self.cache_size else None
+        analyzer_kwargs = dict(
+            backend=self.backend, summary_mode=self.summary_mode, max_detail_rows=self.max_detail_rows
+        )
+        with metrics.timer("model_load"):
+            if self.inference_workers > 1:
+                # Shard batches across worker processes (each with its own
+                # model); the workers get the token cache's path, not the caches
+                analyzer = ParallelSentimentAnalyzer(
+                    workers=self.inference_workers, cache=cache, token_cache_dir=self.token_cache_dir,
+                    **analyzer_kwargs
+                )
+            else:
+                token_cache = TokenCache(self.token_cache_dir) if self.token_cache_dir else None
+                analyzer = SentimentAnalyzer(cache=cache, token_cache=token_cache, **analyzer_kwargs)
+        self.load_time = time.perf_counter() - start
+
+        if self.warmup:
+            # Run one inference so lazy CUDA/MKL initialisation happens now
+            # rather than inside the first user request
+            start = time.perf_counter()
+            with metrics.timer("model_warmup"):
+                analyzer.warm_up()
+            self.warmup_time = time.perf_counter() - start
+
+        self.loaded_at = time.time()
+        self._analyzer = analyzer
+        print(f"Model ready in {self.load_time:.2f}s")
+
+    def analysis_config(self):
+        """Settings that change analysis results, for keying cached analyses"""
+        return {
+            "model_name": MODEL_NAME,
+            "backend": self.backend,
+            "threshold": SENTIMENT_THRESHOLD,
+            "summary_mode": self.summary_mode,
+            "max_detail_rows": self.max_detail_rows,
+        }
+
+    def status(self):
+        """Return load/warm state for the /status endpoint"""
+        return {
+            "model_loaded": self.is_loaded,
+            "state": self.state,
+            "load_error": self.load_error,
+            "model_name": self._analyzer.model_name if self.is_loaded else None,
+            "device": str(self._analyzer.device) if self.is_loaded else None,
+            "backend": self.backend,
+            "inference_workers": self.inference_workers,
+            "summary_mode": self.summary_mode,
+            "max_detail_rows": self.max_detail_rows,
+            "load_time_seconds": self.load_time,
+            "warmup_time_seconds": self.warmup_time,
+            "loaded_at": self.loaded_at,
+            "requests_served": self.requests_served,
+            "cache": self._analyzer.cache.stats() if self.is_loaded and self._analyzer.cache else None,
+            "token_cache": (
+                self._analyzer.token_cache.stats() if self.is_loaded and self._analyzer.token_cache else None
+            ),
+        }
+
+
+# Shared instance used by the Flask app
+registry = ModelRegistry(
+    warmup=os.environ.get("MODEL_WARMUP", "1") != "0",
+    cache_size=int(os.environ.get("SENTIMENT_CACHE_SIZE", "10000")),
+    cache_path=os.environ.get("SENTIMENT_CACHE_PATH") or None,
+    backend=os.environ.get("SENTIMENT_BACKEND", "torch"),
+    inference_workers=int(os.environ.get("INFERENCE_WORKERS", "1")),
+    summary_mode=os.environ.get("SUMMARY_MODE", "lead"),
+    token_cache_dir=os.environ.get("TOKEN_CACHE_DIR") or None,
+    max_detail_rows=int(os.environ["MAX_DETAIL_ROWS"]) if os.environ.get("MAX_DETAIL_ROWS") else None,
+)
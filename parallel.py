@@ -0,0 +1,242 @@
+import collections
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from aggregates import ResultAccumulator
+from analyzer import SentimentAnalyzer
+from cache import SentimentCache
+import metrics
+from token_cache import TokenCache
+
+# Analyzer loaded by the parent before the pool starts. Forked workers
+# inherit it, so the model weights are shared copy-on-write.
+_template_analyzer = None
+
+# Analyzer used inside each worker process
+_worker_analyzer = None
+
+
+class _ShardCache:
+    """
+    Stands in for the SentimentCache inside a worker: serves the results the
+    parent found in its cache for the shard and collects the new ones, which
+    go back to the parent to be stored.
+    """
+
+    make_key = staticmethod(SentimentCache.make_key)
+
+    def __init__(self, known_scores):
+        self.known_scores = known_scores
+        self.fresh_scores = {}
+
+    def get_many(self, keys):
+        return {key: self.known_scores[key] for key in keys if key in self.known_scores}
+
+    def put_many(self, items):
+        self.known_scores.update(items)
+        self.fresh_scores.update(items)
+
+
+def _init_worker(intra_op_threads, token_cache_dir, analyzer_kwargs):
+    global _worker_analyzer
+    import torch
+
+    # Each worker gets a fixed number of intra-op threads so the workers
+    # don't oversubscribe the cores between them
+    torch.set_num_threads(intra_op_threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    # Forked workers start with a copy of the parent's metrics; drop them so
+    # they aren't counted twice when the worker's snapshots are merged back
+    metrics.registry.drain()
+
+    _worker_analyzer = _template_analyzer or SentimentAnalyzer(**analyzer_kwargs)
+    # The sentiment cache stays in the parent (see _ShardCache). The token
+    # cache is safe to share between processes, but each opens its own.
+    _worker_analyzer.cache = None
+    _worker_analyzer.token_cache = TokenCache(token_cache_dir) if token_cache_dir else None
+    _worker_analyzer.warm_up()
+
+
+def _run_shard(score, reviews, known_scores):
+    """
+    Run score(reviews) with the parent's cached sentiment results (None when
+    it has no cache), returning the result, the sentiment results computed
+    for it, the token cache (hits, misses) and the timings and metrics
+    recorded for it
+    """
+    shard_cache = _ShardCache(known_scores) if known_scores is not None else None
+    token_cache = _worker_analyzer.token_cache
+    token_lookups = (token_cache.hits, token_cache.misses) if token_cache is not None else (0, 0)
+    _worker_analyzer.cache = shard_cache
+    try:
+        with metrics.collect() as timings:
+            results = score(reviews)
+    finally:
+        _worker_analyzer.cache = None
+    fresh_scores = shard_cache.fresh_scores if shard_cache is not None else {}
+    if token_cache is not None:
+        token_lookups = (token_cache.hits - token_lookups[0], token_cache.misses - token_lookups[1])
+    return results, fresh_scores, token_lookups, timings.to_dict(), metrics.registry.drain()
+
+
+def _score_reviews(reviews):
+    return _worker_analyzer.score_reviews(reviews)
+
+
+def _aggregate_reviews(reviews):
+    """Score reviews and fold them into a ResultAccumulator, so only the partial aggregates go back to the parent"""
+    scored_reviews = _worker_analyzer.score_reviews(reviews)
+    accumulator = ResultAccumulator(_worker_analyzer.max_detail_rows)
+    with metrics.timer("aggregate"):
+        accumulator.add_many(scored_reviews)
+    return accumulator
+
+
+def _score_shard(reviews, known_scores):
+    return _run_shard(_score_reviews, reviews, known_scores)
+
+
+def _aggregate_shard(reviews, known_scores):
+    return _run_shard(_aggregate_reviews, reviews, known_scores)
+
+
+def _worker_pid(_):
+    return os.getpid()
+
+
+def _fork_is_safe():
+    """
+    A forked child only gets the thread that forked, so locks held by any
+    other thread (the web server, the model preload, request threads) stay
+    locked in it forever. Only fork from the main thread while it is alone.
+    """
+    return (
+        "fork" in multiprocessing.get_all_start_methods()
+        and threading.current_thread() is threading.main_thread()
+        and threading.active_count() == 1
+    )
+
+
+class ParallelSentimentAnalyzer:
+    """
+    Data-parallel version of SentimentAnalyzer. Reviews are split into
+    contiguous shards that are scored by a pool of worker processes, each
+    with its own model, and the results are put back in input order.
+
+    Workers are only given plain settings. The sentiment cache lives in this
+    process: each shard is looked up before it is sent, workers only run the
+    model on the texts that missed, and their results are stored here.
+    """
+
+    def __init__(self, workers=None, intra_op_threads=1, shard_size=64, cache=None, token_cache_dir=None,
+                 **analyzer_kwargs):
+        global _template_analyzer
+        self.workers = workers or os.cpu_count()
+        self.intra_op_threads = intra_op_threads
+        self.shard_size = shard_size
+
+        # Used for the parts that don't need the model (cache lookups,
+        # building results) and, where it is safe to fork, as the workers'
+        # copy-on-write model. Its caches are attached once the workers
+        # exist, so none of them inherits an open database or file.
+        self.analyzer = SentimentAnalyzer(**analyzer_kwargs)
+
+        # ONNX Runtime sessions start their own thread pools when they are
+        # created, so a forked worker can't reuse the parent's
+        if _fork_is_safe() and self.analyzer.backend.name != "onnx":
+            # Fork before the parent runs any inference: forking after torch
+            # has started its thread pools can deadlock the children
+            context = multiprocessing.get_context("fork")
+            _template_analyzer = self.analyzer
+        else:
+            context = multiprocessing.get_context("spawn")
+
+        print(f"Starting {self.workers} inference workers ({context.get_start_method()}) "
+              f"with {intra_op_threads} thread(s) each")
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(intra_op_threads, token_cache_dir, analyzer_kwargs)
+        )
+
+        # Workers are started on first use; start them all now, while it is
+        # still safe to fork, and wait until each has its model
+        list(self.pool.map(_worker_pid, range(self.workers)))
+
+        self.analyzer.cache = cache
+        self.analyzer.token_cache = TokenCache(token_cache_dir) if token_cache_dir else None
+
+    @property
+    def batch_size(self):
+        # Enough reviews per chunk to keep every worker busy
+        return self.shard_size * self.workers
+
+    def __getattr__(self, name):
+        # Everything else (model_name, device, cache, ...) comes from the parent analyzer
+        return getattr(self.analyzer, name)
+
+    def score_reviews(self, reviews, batch_size=None):
+        """Score reviews across the worker pool, keeping the input order"""
+        shards = [reviews[start:start + self.shard_size] for start in range(0, len(reviews), self.shard_size)]
+        futures = [self._submit(_score_shard, shard) for shard in shards]
+
+        scored_reviews = []
+        for future in futures:
+            scored_reviews.extend(self._unpack(future.result()))
+        return scored_reviews
+
+    def analyze_reviews(self, reviews, batch_size=None):
+        """
+        Analyze reviews and return sentiment analysis. Takes any iterable of
+        reviews; a bounded number of shards is in flight at a time and each
+        worker sends back its shard's partial aggregates, which are merged
+        in input order.
+        """
+        if hasattr(reviews, "__len__"):
+            print(f"Analyzing {len(reviews)} reviews on {self.workers} workers...")
+
+        accumulator = ResultAccumulator(self.analyzer.max_detail_rows)
+        reviews = iter(reviews)
+        pending = collections.deque()
+        for shard in iter(lambda: list(itertools.islice(reviews, self.shard_size)), []):
+            pending.append(self._submit(_aggregate_shard, shard))
+            # Two shards per worker keeps them busy without reading the whole input
+            if len(pending) >= 2 * self.workers:
+                accumulator.merge(self._unpack(pending.popleft().result()))
+        while pending:
+            accumulator.merge(self._unpack(pending.popleft().result()))
+
+        return self.analyzer.results_from(accumulator)
+
+    def _submit(self, function, shard):
+        """Send a shard to the workers along with the sentiment results already cached for it"""
+        known_scores = None
+        if self.analyzer.cache is not None:
+            keys = self.analyzer.cache_keys(self.analyzer.texts_to_classify(shard))
+            known_scores = self.analyzer.cache.get_many(keys)
+        return self.pool.submit(function, shard, known_scores)
+
+    def _unpack(self, shard_results):
+        """Store a shard's new sentiment results, fold its counters into this process and return its scores or aggregates"""
+        results, fresh_scores, token_lookups, shard_timings, shard_metrics = shard_results
+        if fresh_scores:
+            self.analyzer.cache.put_many(fresh_scores)
+        if self.analyzer.token_cache is not None:
+            self.analyzer.token_cache.record(*token_lookups)
+        metrics.registry.merge(shard_metrics)
+        timings = metrics.current_timings()
+        if timings is not None:
+            # Summed over workers, so this can exceed the wall time
+            timings.merge(shard_timings)
+        return results
+
+    def build_results(self, totals, detailed_analysis, omitted_rows=0):
+        return self.analyzer.build_results(totals, detailed_analysis, omitted_rows)
+
+    def close(self):
+        self.pool.shutdown()
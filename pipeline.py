@@ -0,0 +1,109 @@
+import contextvars
+import queue
+import threading
+
+from aggregates import ResultAccumulator
+import metrics
+
+# Marks the end of the crawl in the page queue
+_DONE = object()
+
+
+def _put(pages, item, stop):
+    """Put an item on the queue unless the consumer has gone away"""
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produce(page_iter, pages, stop):
+    """Run the crawl in a background thread, handing pages to the analyzer"""
+    try:
+        for page in page_iter:
+            if not _put(pages, page, stop):
+                return
+        _put(pages, _DONE, stop)
+    except Exception as e:
+        # Re-raised in the consumer
+        _put(pages, e, stop)
+    finally:
+        page_iter.close()
+
+
+def iter_analysis(crawler, analyzer, product_url, max_reviews=500, queue_size=8, keep_rows=True):
+    """
+    Crawl and analyze at the same time. Pages of reviews flow from the
+    crawler (running in a background thread) through a bounded queue into
+    the analyzer, so inference starts as soon as the first page arrives.
+
+    Yields (reviews, scored_reviews, accumulator) for every chunk analyzed,
+    where accumulator is the running ResultAccumulator over everything seen
+    so far. It keeps up to the analyzer's max_detail_rows rows, or none if
+    keep_rows is False (when the caller handles the rows itself).
+    """
+    pages = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    # The crawl runs in a copy of this context so its timings reach the current analysis
+    producer = threading.Thread(
+        target=contextvars.copy_context().run,
+        args=(_produce, crawler.iter_review_pages(product_url, max_reviews), pages, stop),
+        daemon=True
+    )
+    producer.start()
+
+    accumulator = ResultAccumulator(analyzer.max_detail_rows if keep_rows else 0)
+    try:
+        done = False
+        while not done:
+            chunk = []
+            item = pages.get()
+
+            # Take whatever else the crawler already has ready (up to one
+            # batch) so batches grow when inference falls behind the crawl
+            while True:
+                if item is _DONE:
+                    done = True
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                chunk.extend(item)
+                if len(chunk) >= analyzer.batch_size:
+                    break
+                try:
+                    item = pages.get_nowait()
+                except queue.Empty:
+                    break
+
+            if chunk:
+                scored_reviews = analyzer.score_reviews(chunk)
+                with metrics.timer("aggregate"):
+                    accumulator.add_many(scored_reviews)
+                yield chunk, scored_reviews, accumulator
+    finally:
+        # Stop the crawl if the consumer gave up early
+        stop.set()
+
+
+def run_pipeline(crawler, analyzer, product_url, max_reviews=500, progress=None):
+    """
+    Crawl and analyze a product, returning (reviews, analysis_results).
+    progress, if given, is called with the number of reviews analyzed so
+    far after each chunk.
+    """
+    reviews = []
+
+    print(f"Streaming reviews from {product_url} into the analyzer...")
+    for chunk, scored_reviews, accumulator in iter_analysis(crawler, analyzer, product_url, max_reviews):
+        reviews.extend(chunk)
+        if progress is not None:
+            progress(len(reviews))
+
+    if not reviews:
+        return reviews, {"error": "No reviews to analyze"}
+
+    return reviews, analyzer.results_from(accumulator)
@@ -0,0 +1,206 @@
+import mmap
+import os
+import threading
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from incremental import review_identities
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialised within a process
+    fcntl = None
+
+STRING_COLUMNS = ("id", "title", "text", "date")
+NUMERIC_COLUMNS = ("rating", "verified")
+
+# One fixed-size row per review. Strings live in a separate heap file and
+# the row holds where each one starts and how many bytes it has.
+ROW_DTYPE = np.dtype(
+    [("key", "V20"), ("rating", "<f8"), ("verified", "i1")]
+    + [field for column in STRING_COLUMNS for field in ((f"{column}_offset", "<i8"), (f"{column}_length", "<i4"))]
+)
+
+# verified is stored as 1/0, or -1 when the site didn't say
+_UNKNOWN = -1
+
+
+class ReviewStore:
+    """
+    Append-only, column-oriented store of crawled reviews, one directory per
+    product under the store's directory.
+
+    Each product has a rows file of fixed-size records (review key, rating,
+    verified flag and the offset/length of each string) and a heap file
+    holding the UTF-8 text of every string back to back. Numeric columns
+    can be read straight into NumPy arrays without touching the heap, and
+    strings are only decoded for the columns asked for.
+
+    Reviews are deduplicated on ingest by the same identity the incremental
+    analysis uses (the site's review id, or the review's date, title and
+    text), so re-crawling a product only appends reviews not stored yet.
+    A review edited on the site keeps its first stored version. Whatever a
+    crashed writer left past the last complete row is cut off before the
+    next append.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _paths(self, product_id):
+        # Product ids come from URLs; quote them so they are safe directory names
+        name = quote(product_id, safe="")
+        if name in ("", ".", ".."):
+            raise ValueError(f"Invalid product id: {product_id!r}")
+        product_dir = os.path.join(self.directory, name)
+        return product_dir, os.path.join(product_dir, "rows.bin"), os.path.join(product_dir, "heap.bin")
+
+    def product_ids(self):
+        """Return the ids of all products with stored reviews"""
+        return sorted(
+            unquote(name) for name in os.listdir(self.directory)
+            if os.path.exists(os.path.join(self.directory, name, "rows.bin"))
+        )
+
+    def _read_rows(self, rows_path):
+        if not os.path.exists(rows_path) or not os.path.getsize(rows_path):
+            return np.empty(0, dtype=ROW_DTYPE)
+        rows = np.memmap(rows_path, dtype=np.uint8, mode="r")
+        # Ignore a trailing row that is still being written
+        count = len(rows) // ROW_DTYPE.itemsize
+        return rows[:count * ROW_DTYPE.itemsize].view(ROW_DTYPE)
+
+    def count(self, product_id):
+        _, rows_path, _ = self._paths(product_id)
+        return len(self._read_rows(rows_path))
+
+    def append(self, product_id, reviews):
+        """Store the reviews of a product that aren't stored yet, returning how many were added"""
+        product_dir, rows_path, heap_path = self._paths(product_id)
+        os.makedirs(product_dir, exist_ok=True)
+
+        with self._lock, open(rows_path, "ab") as rows_file, open(heap_path, "ab") as heap_file:
+            if fcntl is not None:
+                # Held until the files are closed; taken in the same order everywhere
+                fcntl.flock(rows_file, fcntl.LOCK_EX)
+                fcntl.flock(heap_file, fcntl.LOCK_EX)
+
+            existing = self._read_rows(rows_path)
+            stored = set(existing["key"].tolist())
+            rows_end = len(existing) * ROW_DTYPE.itemsize
+            heap_end = max(
+                (int((existing[f"{column}_offset"] + existing[f"{column}_length"]).max()) for column in STRING_COLUMNS),
+                default=0
+            ) if len(existing) else 0
+            del existing
+
+            # Drop a torn row or strings without a row left by a writer that
+            # crashed, so the rows appended below line up and point at their strings
+            if os.path.getsize(rows_path) > rows_end:
+                rows_file.truncate(rows_end)
+            if os.path.getsize(heap_path) > heap_end:
+                heap_file.truncate(heap_end)
+
+            new = []
+            for identity, review in zip(review_identities(reviews), reviews):
+                key = bytes.fromhex(identity)
+                if key not in stored:
+                    stored.add(key)
+                    new.append((key, review))
+            if not new:
+                return 0
+
+            offset = heap_end
+            rows = np.zeros(len(new), dtype=ROW_DTYPE)
+            rows["key"] = [key for key, _ in new]
+            rows["rating"] = [review.get("rating") or 0 for _, review in new]
+            rows["verified"] = [
+                _UNKNOWN if review.get("verified") is None else int(bool(review["verified"])) for _, review in new
+            ]
+
+            chunks = []
+            for column in STRING_COLUMNS:
+                data = [str(review.get(column) or "").encode("utf-8") for _, review in new]
+                lengths = np.array([len(value) for value in data], dtype=np.int64)
+                rows[f"{column}_length"] = lengths
+                rows[f"{column}_offset"] = offset + np.cumsum(lengths) - lengths
+                offset += int(lengths.sum())
+                chunks.extend(data)
+
+            # Strings go in first, so a row never points past the end of the heap
+            heap_file.write(b"".join(chunks))
+            heap_file.flush()
+            rows_file.write(rows.tobytes())
+
+        return len(new)
+
+    @staticmethod
+    def _open_heap(heap_path, whole):
+        if whole:
+            with open(heap_path, "rb") as f:
+                heap = f.read()
+            # Byte offsets are character offsets in ASCII text, so most heaps
+            # can be decoded once and then sliced as a str
+            return heap.decode("ascii") if heap.isascii() else heap
+
+        # Map the heap so only the strings asked for are read from disk
+        with open(heap_path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def load_columns(self, product_id, columns=STRING_COLUMNS + NUMERIC_COLUMNS):
+        """
+        Return a dict of column -> values for one product. Numeric columns are
+        NumPy arrays (verified is -1 where unknown); string columns are lists.
+        """
+        _, rows_path, heap_path = self._paths(product_id)
+        rows = self._read_rows(rows_path)
+
+        unknown = set(columns) - set(STRING_COLUMNS) - set(NUMERIC_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown review columns: {', '.join(sorted(unknown))}")
+
+        result = {column: np.array(rows[column]) for column in columns if column in NUMERIC_COLUMNS}
+        string_columns = [column for column in columns if column in STRING_COLUMNS]
+        if not string_columns:
+            return result
+        if not len(rows) or not os.path.getsize(heap_path):
+            result.update((column, [""] * len(rows)) for column in string_columns)
+            return result
+
+        heap = self._open_heap(heap_path, whole=len(string_columns) > 1)
+        try:
+            for column in string_columns:
+                starts = rows[f"{column}_offset"].tolist()
+                ends = (rows[f"{column}_offset"] + rows[f"{column}_length"]).tolist()
+                if isinstance(heap, str):
+                    result[column] = [heap[start:end] for start, end in zip(starts, ends)]
+                else:
+                    result[column] = [heap[start:end].decode("utf-8") for start, end in zip(starts, ends)]
+        finally:
+            if isinstance(heap, mmap.mmap):
+                heap.close()
+
+        # Keep the order the columns were asked in
+        return {column: result[column] for column in columns}
+
+    def load(self, product_id):
+        """Return the stored reviews of a product as dicts, in the order they were stored"""
+        columns = self.load_columns(product_id)
+        ratings = columns.pop("rating").tolist()
+        verified = columns.pop("verified").tolist()
+
+        reviews = []
+        for index, (review_id, title, text, date) in enumerate(zip(*(columns[name] for name in STRING_COLUMNS))):
+            review = {"id": review_id, "rating": ratings[index], "title": title, "text": text, "date": date}
+            if verified[index] != _UNKNOWN:
+                review["verified"] = bool(verified[index])
+            reviews.append(review)
+        return reviews
+
+    def scan(self, columns=NUMERIC_COLUMNS):
+        """Yield (product_id, columns) for every stored product, reading only the given columns"""
+        for product_id in self.product_ids():
+            yield product_id, self.load_columns(product_id, columns)
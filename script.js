@@ -27,8 +27,11 @@ document.addEventListener('DOMContentLoaded', function() {
         analyzeBtn.disabled = true;
         analyzeBtn.innerHTML = '<span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span> Analyzing...';
         
-        // Send request to server
-        fetch('/analyze', {
+        // Send request to the streaming endpoint; results arrive as
+        // newline-delimited JSON events while reviews are still being analyzed
+        let resultsShown = false;
+        
+        fetch('/analyze/stream', {
             method: 'POST',
             body: formData
         })
@@ -38,15 +41,25 @@ document.addEventListener('DOMContentLoaded', function() {
                     throw new Error(data.error || 'Failed to analyze reviews');
                 });
             }
-            return response.json();
-        })
-        .then(data => {
-            // Display results
-            displayResults(data);
-            
-            // Hide loading, show results
-            loadingSection.classList.add('d-none');
-            resultsSection.classList.remove('d-none');
+            return readEvents(response, event => {
+                if (event.type === 'error') {
+                    throw new Error(event.error || 'Failed to analyze reviews');
+                }
+                
+                if (event.type === 'partial') {
+                    if (!resultsShown) {
+                        // Show results as soon as the first reviews are scored
+                        reviewTableBody.innerHTML = '';
+                        loadingSection.classList.add('d-none');
+                        resultsSection.classList.remove('d-none');
+                        resultsShown = true;
+                    }
+                    appendReviewRows(event.rows);
+                    displayAggregates(event.aggregates);
+                } else if (event.type === 'done') {
+                    displayAggregates(event.results);
+                }
+            });
         })
         .catch(error => {
             // Show error
@@ -60,7 +73,29 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
     
-    function displayResults(data) {
+    async function readEvents(response, onEvent) {
+        // Split the response body into lines and hand each parsed event to onEvent
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            if (value) {
+                buffer += decoder.decode(value, { stream: !done });
+            }
+            
+            const lines = buffer.split('\n');
+            buffer = done ? '' : lines.pop();
+            lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+            
+            if (done) {
+                break;
+            }
+        }
+    }
+    
+    function displayAggregates(data) {
         // Display overall summary
         overallSummary.textContent = data.overall_summary;
         
@@ -84,11 +119,14 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         }
         
-        // Clear previous table data
-        reviewTableBody.innerHTML = '';
-        
+        // Create or update charts
+        createSentimentChart(data.sentiment_distribution);
+        createFocusChart(data.product_related, data.non_product_related);
+    }
+    
+    function appendReviewRows(rows) {
         // Add rows to the table
-        data.detailed_analysis.forEach(review => {
+        rows.forEach(review => {
             const row = document.createElement('tr');
             
             // Rating column
@@ -121,16 +159,16 @@ document.addEventListener('DOMContentLoaded', function() {
             
             reviewTableBody.appendChild(row);
         });
-        
-        // Create charts
-        createSentimentChart(data.sentiment_distribution);
-        createFocusChart(data.product_related, data.non_product_related);
     }
     
     function createSentimentChart(distribution) {
-        // Destroy previous chart if it exists
+        const data = [distribution.Positive, distribution.Negative, distribution.Neutral];
+        
+        // Update the existing chart in place while results are streaming in
         if (sentimentChart) {
-            sentimentChart.destroy();
+            sentimentChart.data.datasets[0].data = data;
+            sentimentChart.update();
+            return;
         }
         
         const ctx = document.getElementById('sentimentChart').getContext('2d');
@@ -139,11 +177,7 @@ document.addEventListener('DOMContentLoaded', function() {
             data: {
                 labels: ['Positive', 'Negative', 'Neutral'],
                 datasets: [{
-                    data: [
-                        distribution.Positive,
-                        distribution.Negative,
-                        distribution.Neutral
-                    ],
+                    data: data,
                     backgroundColor: [
                         '#28a745',  // green for positive
                         '#dc3545',  // red for negative
@@ -164,9 +198,11 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     function createFocusChart(productRelated, nonProductRelated) {
-        // Destroy previous chart if it exists
+        // Update the existing chart in place while results are streaming in
         if (focusChart) {
-            focusChart.destroy();
+            focusChart.data.datasets[0].data = [productRelated, nonProductRelated];
+            focusChart.update();
+            return;
         }
         
         const ctx = document.getElementById('focusChart').getContext('2d');
@@ -0,0 +1,150 @@
+import re
+
+# Words whose trailing period doesn't end a sentence
+ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "approx",
+    "e.g", "i.e", "a.m", "p.m", "u.s", "inc", "ltd", "dept", "fig",
+})
+
+
+
+def _boundary_pattern():
+    # Python's lookbehinds must be fixed width, so the abbreviations are
+    # grouped by length into one negative lookbehind each
+    by_length = {}
+    for abbreviation in ABBREVIATIONS:
+        by_length.setdefault(len(abbreviation), []).append(re.escape(abbreviation))
+    not_abbreviation = "".join(
+        rf"(?<!\b(?i:{'|'.join(sorted(words))})\.\s)" for words in by_length.values()
+    )
+    # Nor a capitalised initial ("J. Smith")
+    not_abbreviation += r"(?<!\b[A-Z]\.\s)"
+
+    # Whitespace after sentence-ending punctuation, which may be followed by
+    # a closing quote or bracket. The pattern starts with \s so the regex
+    # engine only tries it at whitespace, and only looks back at the
+    # punctuation from there.
+    return re.compile(
+        rf"\s(?:(?<=[.!?]\s){not_abbreviation}|(?<=[.!?][\"')\]]\s))\s*"
+    )
+
+
+# Matches the whitespace between two sentences, so splitting a text into
+# sentences is a single call into the regex engine
+_BOUNDARY = _boundary_pattern()
+
+_CLOSERS = "\"')]"
+
+SUMMARY_MODES = ("lead", "extractive")
+
+
+def segment_sentences(text):
+    """Split text into sentences on '.', '!' and '?', skipping abbreviations and initials"""
+    return [sentence for sentence in _BOUNDARY.split(text.strip()) if sentence]
+
+
+def _ends_sentence(word):
+    """Whether a sentence ends with this word (when whitespace follows it)"""
+    word = word.rstrip(_CLOSERS)
+    if word[-1:] in ("!", "?") or word.endswith(".."):
+        return True
+    if not word.endswith("."):
+        return False
+    word = word[:-1]
+    return word.lower() not in ABBREVIATIONS and not (len(word) == 1 and word.isupper())
+
+
+def _terminate(summary):
+    # The last sentence of a review often has no full stop
+    return summary if summary.rstrip(_CLOSERS)[-1:] in (".", "!", "?") else summary + "."
+
+
+def lead_summary(text, max_words=50):
+    """
+    Take whole sentences from the start of text up to max_words, cutting the
+    last one short with "...". This is always the first max_words words, so
+    only the word where the cut falls has to be checked for a sentence end.
+    """
+    words = text.split(None, max_words)
+    if len(words) <= max_words:
+        # The whole text fits
+        return _terminate(" ".join(words)) if words else ""
+
+    # The last item is the rest of the text
+    words.pop()
+    if not words:
+        return ""
+    summary = " ".join(words)
+    return summary if _ends_sentence(words[-1]) else summary + "..."
+
+
+def extractive_summary(sentences, scores, max_words=50):
+    """Take the highest scoring sentences that fit in max_words, in their original order"""
+    word_counts = [len(sentence.split()) for sentence in sentences]
+    if sum(word_counts) <= max_words:
+        return lead_summary(" ".join(sentences), max_words)
+
+    chosen = []
+    word_count = 0
+    # Stable sort: on equal scores the earlier sentence wins
+    for index in sorted(range(len(sentences)), key=lambda index: -scores[index]):
+        if word_count + word_counts[index] <= max_words:
+            chosen.append(index)
+            word_count += word_counts[index]
+
+    if not chosen:
+        # Every sentence is longer than the budget on its own
+        return lead_summary(" ".join(sentences), max_words)
+    return " ".join(_terminate(sentences[index]) for index in sorted(chosen))
+
+
+class Summarizer:
+    """
+    Builds the per-review summaries. "lead" keeps the opening sentences;
+    "extractive" keeps the sentences a scorer rates highest (e.g. the ones
+    the sentiment model is most confident about).
+    """
+
+    def __init__(self, max_words=50, mode="lead"):
+        if mode not in SUMMARY_MODES:
+            raise ValueError(f"Unknown summary mode '{mode}', expected one of: {', '.join(SUMMARY_MODES)}")
+        self.max_words = max_words
+        self.mode = mode
+
+    def summarize(self, text, sentence_scorer=None):
+        return self.summarize_batch([text], sentence_scorer)[0]
+
+    def sentences_to_rank(self, texts):
+        """Map the index of each text whose sentences need scoring (extractive mode only) to its sentences"""
+        if self.mode == "lead":
+            return {}
+
+        # Only reviews longer than the budget need their sentences ranked
+        to_rank = {}
+        for index, text in enumerate(texts):
+            if len(text.split(None, self.max_words)) > self.max_words:
+                sentences = segment_sentences(text)
+                if len(sentences) > 1:
+                    to_rank[index] = sentences
+        return to_rank
+
+    def summarize_batch(self, texts, sentence_scorer=None):
+        """
+        Summarize a batch of texts. In extractive mode sentence_scorer is
+        called once with every sentence that needs ranking and must return
+        one score per sentence.
+        """
+        if self.mode == "lead" or sentence_scorer is None:
+            return [lead_summary(text, self.max_words) for text in texts]
+
+        to_rank = self.sentences_to_rank(texts)
+        scores = iter(sentence_scorer([sentence for sentences in to_rank.values() for sentence in sentences]))
+
+        summaries = []
+        for index, text in enumerate(texts):
+            sentences = to_rank.get(index)
+            if sentences is None:
+                summaries.append(lead_summary(text, self.max_words))
+            else:
+                summaries.append(extractive_summary(sentences, [next(scores) for _ in sentences], self.max_words))
+        return summaries
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialised within a process
+    fcntl = None
+
+# One index record per cached text: where its token ids start in the ids
+# file and how many there are
+INDEX_DTYPE = np.dtype([("key", "V16"), ("offset", "<i8"), ("length", "<i4")])
+TOKEN_DTYPE = np.dtype("<i4")
+
+
+class TokenCache:
+    """
+    On-disk cache of tokenizer output, keyed by tokenizer and text.
+
+    Token ids of every cached text are appended to one flat int32 file
+    (tokens.ids) that is memory-mapped for reading, so a cached sequence is
+    a zero-copy view into the map. A second file (tokens.idx) holds a
+    fixed-size record per text with its key, offset and length. Attention
+    masks are not stored: before padding they are all ones, so the length
+    is enough to rebuild them.
+
+    Both files are append-only. Records are written after their ids, so
+    other processes sharing the directory only ever see complete entries.
+    Whatever a crashed writer left past the last complete entry is cut off
+    before the next append.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.ids_path = os.path.join(directory, "tokens.ids")
+        self.index_path = os.path.join(directory, "tokens.idx")
+        self.hits = 0
+        self.misses = 0
+        self._index = {}
+        self._index_bytes_read = 0
+        # Token ids used by the records read so far; anything after them is a torn append
+        self._ids_end = 0
+        self._ids = None
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._refresh_index()
+
+    @staticmethod
+    def make_key(text, tokenizer_id):
+        """Hash the text together with the tokenizer (name and settings) that produced the ids"""
+        return hashlib.blake2b(f"{tokenizer_id}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+    def _refresh_index(self):
+        # Pick up records appended since the last read (possibly by another process)
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_bytes_read)
+            data = f.read()
+
+        # Ignore a trailing record that is still being written
+        count = len(data) // INDEX_DTYPE.itemsize
+        records = np.frombuffer(data, dtype=INDEX_DTYPE, count=count)
+        for key, offset, length in zip(records["key"].tolist(), records["offset"].tolist(),
+                                       records["length"].tolist()):
+            self._index[key] = (offset, length)
+            self._ids_end = max(self._ids_end, offset + length)
+        self._index_bytes_read += count * INDEX_DTYPE.itemsize
+
+    def _token_ids(self, end):
+        # Remap the ids file when it has grown past the current map
+        if self._ids is None or len(self._ids) < end:
+            self._ids = np.memmap(self.ids_path, dtype=TOKEN_DTYPE, mode="r")
+        return self._ids
+
+    def get_many(self, keys):
+        """Return a dict of key -> int32 array of token ids for the keys that are cached"""
+        found = {}
+        with self._lock:
+            if any(key not in self._index for key in keys):
+                self._refresh_index()
+
+            entries = {key: self._index[key] for key in keys if key in self._index}
+            if entries:
+                ids = self._token_ids(max(offset + length for offset, length in entries.values()))
+                for key, (offset, length) in entries.items():
+                    found[key] = ids[offset:offset + length]
+
+            for key in keys:
+                if key in found:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+
+        return found
+
+    def put_many(self, items):
+        """Append a dict of key -> sequence of token ids"""
+        if not items:
+            return
+
+        with self._lock, open(self.ids_path, "ab") as ids_file, open(self.index_path, "ab") as index_file:
+            if fcntl is not None:
+                # Held until the files are closed; taken in the same order everywhere
+                fcntl.flock(ids_file, fcntl.LOCK_EX)
+                fcntl.flock(index_file, fcntl.LOCK_EX)
+
+            # Another process may have cached some of these since we last looked
+            self._refresh_index()
+            items = {key: ids for key, ids in items.items() if key not in self._index}
+            if not items:
+                return
+
+            # Drop a partial record or ids without a record left by a writer
+            # that crashed, so the offsets written below stay right
+            index_file.truncate(self._index_bytes_read)
+            if os.path.getsize(self.ids_path) > self._ids_end * TOKEN_DTYPE.itemsize:
+                ids_file.truncate(self._ids_end * TOKEN_DTYPE.itemsize)
+                self._ids = None
+            offset = self._ids_end
+
+            records = np.empty(len(items), dtype=INDEX_DTYPE)
+            chunks = []
+            for row, (key, ids) in enumerate(items.items()):
+                records[row] = (key, offset, len(ids))
+                chunks.append(np.asarray(ids, dtype=TOKEN_DTYPE))
+                offset += len(ids)
+
+            ids_file.write(np.concatenate(chunks).tobytes())
+            ids_file.flush()
+            index_file.write(records.tobytes())
+
+        with self._lock:
+            self._refresh_index()
+
+    def record(self, hits, misses):
+        """Count lookups made through another process's instance of the cache"""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self):
+        with self._lock:
+            # Include entries other processes have added
+            self._refresh_index()
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._index),
+            "size_bytes": os.path.getsize(self.ids_path) if os.path.exists(self.ids_path) else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }